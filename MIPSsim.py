@@ -1,49 +1,106 @@
 
 import argparse as ap
-from mips32 import Instruction, Data
-from utils import extract_data, signed_str_to_int, int_to_16bitstr
-# from simplesim import SimpleSim
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from mips32 import dis_assembly_bulk
+from utils import ProgramImage, extract_image, stream_program, load_word_array, dis_assembly_parallel
+from collections import OrderedDict
+from simplesim import SimpleSim, RunSummary
 from pipeline import Pipeline
+from sampling import sampled_simulation
 
 parser = ap.ArgumentParser(description='MIPS 32 Simulator by ZhouZhou')
 parser.add_argument('--input', type=str, default='testsample.txt',
                     help="path of input file")
+parser.add_argument('--input-format', type=str, default='text', choices=['text', 'bin'],
+                    help="format of input file, 'text' with one '0'/'1' line per word or 'bin' with raw big-endian words")
 parser.add_argument('--outputfilename', type=str, default='simulation.txt',
                     help="path of output file for simulation")
 parser.add_argument('--outputdis',  type=str, default='disassembly.txt',
                     help="path of output file for disassembly")
+parser.add_argument('--vectorized', action='store_true',
+                    help="disassemble the whole image at once with numpy")
+parser.add_argument('--jobs', type=int, default=1,
+                    help="number of worker processes for the disassembly of large inputs")
+parser.add_argument('--fast-forward', type=int, default=None,
+                    help="run this many instructions functionally with SimpleSim, save a checkpoint and start the pipeline from it")
+parser.add_argument('--checkpoint', type=str, default=None,
+                    help="path of the checkpoint file written by --fast-forward, or read to start the pipeline from it")
+parser.add_argument('--sampling', action='store_true',
+                    help="estimate the cycles with a sampled simulation instead of simulating every cycle, the report is written to the output file for simulation. The reported confidence interval is the sampling error only")
+parser.add_argument('--sample-interval', type=int, default=10000,
+                    help="number of instructions between two detailed windows of the sampled simulation")
+parser.add_argument('--sample-warmup', type=int, default=200,
+                    help="number of instructions simulated in detail before the measure of each window")
+parser.add_argument('--sample-window', type=int, default=1000,
+                    help="number of measured instructions of each window")
 parser.add_argument('--operation',  type=str, default='dis_sim', choices=[
                     'dis_sim', 'dis', 'sim'], help="Disassembly or simulation. The value can be 'dis_sim' which performs both disassembly and the simulation, 'dis' which performs disassembley or 'sim' which performs simulation")
 
-args = parser.parse_args()
-operation = args.operation
-PC = 64
-inst_byte_size = 4
+subparsers = parser.add_subparsers(dest='command')
+parser_batch = subparsers.add_parser('batch', help="run the simulation of many programs in a process pool")
+parser_batch.add_argument('--manifest', type=str, default='jobs.txt',
+                          help="path of the manifest, one job per line: the input file and optionally its output file")
+parser_batch.add_argument('--jobs', dest='batch_jobs', type=int, default=os.cpu_count(),
+                          help="number of worker processes")
+parser_batch.add_argument('--simulator', type=str, default='pipeline', choices=['pipeline', 'simple'],
+                          help="'pipeline' writes the cycle by cycle output, 'simple' runs SimpleSim and writes the final state")
+parser_batch.add_argument('--mode', type=str, default='block', choices=['interp', 'threaded', 'block'],
+                          help="execution mode of SimpleSim")
+parser_batch.add_argument('--input-format', type=str, default='text', choices=['text', 'bin'],
+                          help="format of the input files")
+parser_batch.add_argument('--output-dir', type=str, default=None,
+                          help="directory of the outputs without an output file in the manifest, next to the input by default")
+parser_batch.add_argument('--max-cycles', type=int, default=None,
+                          help="stop a pipeline job after this many cycles, a simple job after this many instructions")
+parser_batch.add_argument('--report', type=str, default='batch_report.csv',
+                          help="path of the merged report, JSON if it ends with .json and CSV otherwise")
 
 
-def dis_assembly():
-    global PC
-    is_break = False
-    with open(args.input, 'r') as file_in:
+def dis_assembly(args):
+    """
+    write the disassembly. The program for the simulation is built in the same pass over the input
+    :param args: parsed command line arguments
+    :return: instruction and data memory, or None if the disassembly did not build them
+    """
+    if args.vectorized:
+        lines = dis_assembly_bulk(load_word_array(args.input, args.input_format))
         with open(args.outputdis, 'wt') as file_out:
-            for read_buf in file_in.readlines():
-                read_buf = read_buf.strip()
-                if is_break:
-                    write_buf = Data(data_str=read_buf, pc_val=PC)
-                else:
-                    write_buf = Instruction(instr_str=read_buf, pc_val=PC)
-                    is_break = write_buf.is_break()
+            file_out.write(''.join(line + '\n' for line in lines))
+        return None
+    if args.jobs > 1:
+        dis_assembly_parallel(args.input, args.outputdis, args.jobs, args.input_format)
+        return None
+    instr_mem, data_mem = ProgramImage(), OrderedDict()
+    with open(args.outputdis, 'wt') as file_out:
+        for write_buf in stream_program(args.input, instr_mem, data_mem, args.input_format):
+            file_out.write(str(write_buf) + '\n')
 
-                file_out.write(str(write_buf) + '\n')
+            # print(str(write_buf) + '\n')
+    return instr_mem, data_mem
 
-                # print(str(write_buf) + '\n')
-                PC += inst_byte_size
 
-
-def simulation():
-    instr_mem, data_mem = extract_data(args.input)
+def simulation(args, program=None):
+    if program is None:
+        program = extract_image(args.input, input_format=args.input_format)
+    instr_mem, data_mem = program
+    if args.sampling:
+        report = sampled_simulation(instr_mem, data_mem, args.sample_interval, args.sample_warmup, args.sample_window)
+        with open(args.outputfilename, 'wt') as file_out:
+            file_out.write(str(report))
+        return
     # sim = SimpleSim(instr_mem, data_mem)
-    sim = Pipeline(instr_mem, data_mem)
+    if args.fast_forward is not None:
+        functional = SimpleSim(instr_mem, data_mem, mode='block')
+        functional.run(max_instructions=args.fast_forward)
+        functional.save_checkpoint(args.checkpoint or 'checkpoint.bin')
+    if args.fast_forward is not None or args.checkpoint is not None:
+        sim = Pipeline.from_checkpoint(args.checkpoint or 'checkpoint.bin', instr_mem)
+    else:
+        sim = Pipeline(instr_mem, data_mem)
     cycle = 0
     ## uncomment to run the homework 1
     # with open(args.outputfilename, 'wt') as file_out:
@@ -58,22 +115,137 @@ def simulation():
     #         file_out.write(str(write_buf))
     ## for homework 2
     with open(args.outputfilename, 'wt') as file_out:
-        while not sim.is_over:
-            sim.next_cycle()
-            write_buf = '--------------------\nCycle:{}\n\n{}{}{}{}{}{}{}{}\n{}\n{}'.format(
-                sim.cycle, sim.snapshotifunit(), str(sim.PreIssue), str(sim.PreALU), str(sim.PostALU), 
-                str(sim.PreALUB), str(sim.PostALUB), str(sim.PreMEM), str(sim.PostMEM), str(sim.RF), str(sim.DS))
-            file_out.write(str(write_buf))
-            
+        write_pipeline_trace(sim, file_out)
 
 
-if __name__ == "__main__":
-    print("This is the MIPS 32 Simulator homework 2 done by ZhouZhou for 2022 Computer Architecture.")
+def write_pipeline_trace(sim, file_out, max_cycles=None):
+    """
+    run the pipeline until the end of the program and write the state of each cycle
+    :param sim: Pipeline
+    :param file_out: output file
+    :param max_cycles: stop after this many cycles, None for no limit
+    :return: True if the program ended
+    """
+    # the ALUB only waits with an unchanged state when it takes more than two cycles
+    skip_idle = sim.alub_latency > 2
+    while not sim.is_over:
+        if sim.cycle == max_cycles:
+            return False
+        sim.next_cycle()
+        state_buf = '{}{}{}{}{}{}{}{}\n{}\n{}'.format(
+            sim.snapshotifunit(), str(sim.PreIssue), str(sim.PreALU), str(sim.PostALU),
+            str(sim.PreALUB), str(sim.PostALUB), str(sim.PreMEM), str(sim.PostMEM), str(sim.RF), str(sim.DS))
+        file_out.write('--------------------\nCycle:{}\n\n{}'.format(sim.cycle, state_buf))
+        if skip_idle:
+            # the skipped idle cycles have the state of the last cycle
+            last_cycle = sim.cycle
+            sim.fast_forward(max_cycles)
+            for cycle in range(last_cycle + 1, sim.cycle + 1):
+                file_out.write('--------------------\nCycle:{}\n\n{}'.format(cycle, state_buf))
+    return True
+
+
+# fields of the job summaries, in the column order of the CSV report
+SUMMARY_FIELDS = ('input', 'output', 'simulator', 'cycles', 'instructions', 'registers', 'wall_time', 'error')
+
+
+def run_job(input_path, output_path, simulator='pipeline', input_format='text', mode='block', max_cycles=None):
+    """
+    simulate one program and write its output, errors are reported in the summary
+    :param input_path: path of input file
+    :param output_path: path of output file
+    :param simulator: 'pipeline' or 'simple'
+    :param input_format: 'text' or 'bin'
+    :param mode: execution mode of SimpleSim
+    :param max_cycles: stop a pipeline job after this many cycles, a simple job after this many instructions
+    :return: dict summary of the job: cycles, instructions, final registers, wall time and error
+    """
+    summary = dict.fromkeys(SUMMARY_FIELDS)
+    summary.update(input=input_path, output=output_path, simulator=simulator, error='')
+    start = time.perf_counter()
     try:
-        if operation == 'dis' or operation == 'dis_sim':
-            dis_assembly()   # uncomment this line to perform disassembly
-            # print("not for assignment 2")
-        if operation == 'sim' or operation == 'dis_sim':
-            simulation()
-    except:
-        print("程序错误")
\ No newline at end of file
+        instr_mem, data_mem = extract_image(input_path, input_format=input_format)
+        with open(output_path, 'wt') as file_out:
+            if simulator == 'pipeline':
+                sim = Pipeline(instr_mem, data_mem)
+                if not write_pipeline_trace(sim, file_out, max_cycles):
+                    summary['error'] = 'cycle limit reached'
+                summary['instructions'] = sim.fetched
+            else:
+                sim = SimpleSim(instr_mem, data_mem, mode=mode)
+                result = sim.run(max_instructions=max_cycles)
+                if result.stop_reason == RunSummary.MAX_INSTRUCTIONS:
+                    summary['error'] = 'cycle limit reached'
+                summary['instructions'] = result.instructions
+                file_out.write('{}\n{}'.format(str(sim.RF), str(sim.DS)))
+        summary['cycles'] = sim.cycle
+        summary['registers'] = list(sim.RF.R)
+    except Exception as e:
+        summary['error'] = '{}: {}'.format(e.__class__.__name__, e)
+    summary['wall_time'] = time.perf_counter() - start
+    return summary
+
+
+def read_manifest(args):
+    """
+    :return: list of (input path, output path) of the jobs of the manifest, blank lines and # comments are skipped
+    """
+    jobs = []
+    with open(args.manifest, 'r') as file_in:
+        for read_buf in file_in:
+            fields = read_buf.split('#', 1)[0].split()
+            if not fields:
+                continue
+            input_path = fields[0]
+            if len(fields) > 1:
+                output_path = fields[1]
+            elif args.output_dir is not None:
+                output_path = os.path.join(args.output_dir, os.path.basename(input_path) + '.sim')
+            else:
+                output_path = input_path + '.sim'
+            jobs.append((input_path, output_path))
+    return jobs
+
+
+def batch(args):
+    """
+    run the jobs of the manifest in a process pool and write the merged report
+    :param args: parsed command line arguments of the batch command
+    :return: list of the job summaries, in the order of the manifest
+    """
+    jobs = read_manifest(args)
+    with ProcessPoolExecutor(max_workers=args.batch_jobs) as executor:
+        futures = [executor.submit(run_job, input_path, output_path, args.simulator, args.input_format, args.mode,
+                                   args.max_cycles) for input_path, output_path in jobs]
+        summaries = [future.result() for future in futures]
+    with open(args.report, 'wt', newline='') as file_out:
+        if args.report.endswith('.json'):
+            json.dump(summaries, file_out, indent=1)
+        else:
+            writer = csv.DictWriter(file_out, fieldnames=SUMMARY_FIELDS)
+            writer.writeheader()
+            for summary in summaries:
+                row = dict(summary)
+                row['registers'] = ' '.join(str(val) for val in summary['registers'] or [])
+                writer.writerow(row)
+    return summaries
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.command == 'batch':
+        summaries = batch(args)
+        print('{} jobs, {} failed, report written to {}'.format(
+            len(summaries), sum(1 for summary in summaries if summary['error']), args.report))
+    else:
+        operation = args.operation
+        print("This is the MIPS 32 Simulator homework 2 done by ZhouZhou for 2022 Computer Architecture.")
+        try:
+            program = None
+            if operation == 'dis' or operation == 'dis_sim':
+                program = dis_assembly(args)   # uncomment this line to perform disassembly
+                # print("not for assignment 2")
+            if operation == 'sim' or operation == 'dis_sim':
+                simulation(args, program)
+        except:
+            print("程序错误")
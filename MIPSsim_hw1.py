@@ -11,6 +11,10 @@ parser.add_argument('--outputsim', type=str, default='simulation.txt',
                     help="path of output file for simulation")
 parser.add_argument('--outputdis',  type=str, default='disassembly.txt',
                     help="path of output file for disassembly")
+parser.add_argument('--mode',  type=str, default='interp', choices=['interp', 'threaded', 'block'],
+                    help="execution mode of the simulator, 'interp', 'threaded' or 'block'")
+parser.add_argument('--max-instructions',  type=int, default=99,
+                    help="number of instructions to simulate at most, the homework output stops before cycle 100")
 parser.add_argument('--operation',  type=str, default='dis_sim', choices=[
                     'dis_sim', 'dis', 'sim'], help="Disassembly or simulation. The value can be 'dis_sim' which performs both disassembly and the simulation, 'dis' which performs disassembley or 'sim' which performs simulation")
 
@@ -40,18 +44,12 @@ def dis_assembly():
 
 def simulation():
     instr_mem, data_mem = extract_data(args.input)
-    sim = SimpleSim(instr_mem, data_mem)
-    cycle = 0
+    sim = SimpleSim(instr_mem, data_mem, mode=args.mode)
     with open(args.outputsim, 'wt') as file_out:
-        while not sim.is_over:
-            cycle += 1
-            if cycle == 100:
-                break
-            write_buf = '--------------------\nCycle:{}\t{}\t{}'.format(sim.cycle + 1, 
-                                    str(sim.PC), '\t'.join(str(instr_mem[sim.PC].desc_str).split(' ', 1)))
-            sim.next_instr()
-            write_buf += '\n\n{}\n{}\n'.format(str(sim.RF), str(sim.DS))
-            file_out.write(str(write_buf))
+        def trace(sim, pc):
+            file_out.write('--------------------\nCycle:{}\t{}\t{}\n\n{}\n{}\n'.format(
+                sim.cycle, str(pc), '\t'.join(str(instr_mem[pc].desc_str).split(' ', 1)), str(sim.RF), str(sim.DS)))
+        sim.run(max_instructions=args.max_instructions, trace=trace)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+from mips32 import InstructionJump, InstructionJumpRegister, InstructionBranchOnEqual, InstructionBranchOnGreaterThanZero, InstructionBranchOnLessThanZero, InstructionStoreWord, InstructionLoadWord, InstructionShiftWordLeftLogical, InstructionShiftWordRightLogical, InstructionShiftWordRightArithmetic, InstructionAnd, InstructionNotOr, InstructionMulWord, InstructionSubtractWord, InstructionAddWord, InstructionSetOnLessThan, InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2, InstructionSetOnLessThan2, InstructionNoOperation, InstructionBreakpoint, sign_extend
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('the batched simulator requires numpy')
+    return numpy
+
+
+class BatchSim:
+    """
+    Functional simulation of K instances of the same program over different data sections, in lock step.
+    The registers are a numpy int64 array (K, 32), the data sections an int32 array (K, words) starting at the
+    same base address. The instances are grouped by PC, every instruction runs once per group as a numpy
+    operation on the rows of the group. Branches split a group by outcome, the groups meeting at a PC merge
+    again and the group with the lowest PC runs first, so that diverged instances reconverge.
+    Memory accesses must stay in the data section, the registers wrap at 64 bits instead of growing like the
+    python integers of SimpleSim.
+    """
+
+    def __init__(self, instr_mem, data, base, pc=64):
+        """
+        :param instr_mem: instruction memory, e.g. from utils.extract_data
+        :param data: array-like (K, words) of the data sections
+        :param base: address of the first word of the data sections
+        :param pc: PC of the first instruction
+        """
+        np = self.np = _import_numpy()
+        self.instr_mem = instr_mem
+        self.M = np.array(data, dtype=np.int32, ndmin=2)
+        self.size = len(self.M)
+        self.R = np.zeros((self.size, 32), dtype=np.int64)
+        self.base = base
+        self.PC = np.full(self.size, pc, dtype=np.int64)
+        self.instructions = np.zeros(self.size, dtype=np.int64)
+        self.is_over = np.zeros(self.size, dtype=bool)
+        self.code = {pc: _batch_instr(inst, self) for pc, inst in instr_mem.items()}
+
+    @classmethod
+    def from_data_mems(cls, instr_mem, data_mems):
+        """
+        :param instr_mem: instruction memory
+        :param data_mems: list of the data memories, dicts of the Data keyed by their consecutive addresses
+        :return: BatchSim
+        """
+        base = next(iter(data_mems[0]), 0)
+        return cls(instr_mem, [[data.int_val for data in data_mem.values()] for data_mem in data_mems], base)
+
+    def run(self, max_instructions=None):
+        """
+        run all the instances until BREAK or the instruction limit
+        :param max_instructions: maximum number of instructions executed by each instance, None for no limit
+        :return: array of the number of instructions executed by each instance
+        """
+        np = self.np
+        limit = -1 if max_instructions is None else max_instructions
+        groups = {}
+        for pc in np.unique(self.PC[~self.is_over]):
+            groups[int(pc)] = np.flatnonzero((self.PC == pc) & ~self.is_over)
+        code = self.code
+        all_rows = np.arange(self.size)
+
+        def add_group(pc, rows):
+            # the rows of the groups are disjoint, merging is a concatenation
+            groups[pc] = np.concatenate((groups[pc], rows)) if pc in groups else rows
+
+        while groups:
+            pc = min(groups)
+            rows = groups.pop(pc)
+            sel = rows
+            if len(rows) == self.size:
+                # plain slices for the whole batch, the rows must then be in order as well
+                sel, rows = slice(None), all_rows
+            n = 0
+            # instructions the group may run before the first of its instances reaches the limit
+            budget = -1 if limit < 0 else int((limit - self.instructions[rows]).min())
+            while True:
+                if n == budget:
+                    self.PC[rows] = pc
+                    self.instructions[rows] += n
+                    n = 0
+                    rows = rows[self.instructions[rows] < limit]
+                    if len(rows):
+                        add_group(pc, rows)
+                    break
+                next_pc = code[pc](sel, rows)
+                n += 1
+                if next_pc is None:
+                    self.PC[rows] = pc
+                    self.is_over[rows] = True
+                    break
+                if type(next_pc) is not int:
+                    # a branch, the group goes on as a whole when all the instances agree
+                    same = next_pc == next_pc[0]
+                    if same.all():
+                        next_pc = int(next_pc[0])
+                    else:
+                        self.instructions[rows] += n
+                        n = 0
+                        while len(rows):
+                            add_group(int(next_pc[0]), rows[same])
+                            rows, next_pc = rows[~same], next_pc[~same]
+                            same = next_pc == next_pc[:1]
+                        break
+                if next_pc in groups:
+                    add_group(next_pc, rows)
+                    break
+                pc = next_pc
+            self.instructions[rows] += n
+        return self.instructions
+
+    def _mem_index(self, addr):
+        # word index of the addresses in the data sections, bounds checked
+        offset = addr - self.base
+        idx = offset >> 2
+        if (offset & 3).any() or (idx < 0).any() or (idx >= self.M.shape[1]).any():
+            raise Exception('Memory address out of range!')
+        return idx
+
+
+def _batch_instr(inst, sim):
+    """
+    specialize the instruction into a closure over the arrays of the BatchSim, like the threaded mode of SimpleSim.
+    :param inst: decoded Instruction
+    :param sim: BatchSim
+    :return: closure (sel, rows) -> next PC as an int, an array of the next PC of the rows for branches, or None for
+             BREAK. sel indexes the rows of the group, it is a slice when the group holds all the instances.
+    """
+    np = sim.np
+    R, M = sim.R, sim.M
+    cls = inst.__class__
+    next_pc = inst.pc_val + 4
+    rs, rt, rd, sa = inst.rs, inst.rt, inst.rd, inst.shamt
+
+    def wrap(val):
+        return val.astype(np.int32).astype(np.int64)
+
+    if cls is InstructionBreakpoint:
+        def run(sel, rows):
+            return None
+    elif cls is InstructionNoOperation:
+        def run(sel, rows):
+            return next_pc
+    # branch instructions
+    elif cls is InstructionJump:
+        target = inst.dest
+
+        def run(sel, rows):
+            return target
+    elif cls is InstructionJumpRegister:
+        def run(sel, rows):
+            return R[sel, rs].copy()
+    elif cls is InstructionBranchOnEqual:
+        target = next_pc + inst.dest
+
+        def run(sel, rows):
+            return np.where(R[sel, rs] == R[sel, rt], target, next_pc)
+    elif cls is InstructionBranchOnGreaterThanZero:
+        target = next_pc + (sign_extend(inst.imm) << 2)
+
+        def run(sel, rows):
+            return np.where(R[sel, rs] > 0, target, next_pc)
+    elif cls is InstructionBranchOnLessThanZero:
+        target = next_pc + (sign_extend(inst.imm) << 2)
+
+        def run(sel, rows):
+            return np.where(R[sel, rs] < 0, target, next_pc)
+    # memory instructions
+    elif cls is InstructionStoreWord:
+        offset = inst.op1_val
+
+        def run(sel, rows):
+            M[rows, sim._mem_index(R[sel, rs] + offset)] = R[sel, rt]
+            return next_pc
+    elif cls is InstructionLoadWord:
+        offset = inst.op1_val
+
+        def run(sel, rows):
+            R[sel, rt] = M[rows, sim._mem_index(R[sel, rs] + offset)]
+            return next_pc
+    # category 1 ALU instructions, rd <- rs op rt
+    elif cls is InstructionShiftWordLeftLogical:
+        def run(sel, rows):
+            R[sel, rd] = wrap(R[sel, rt] << sa)
+            return next_pc
+    elif cls is InstructionShiftWordRightLogical:
+        def run(sel, rows):
+            R[sel, rd] = wrap((R[sel, rt] & 0xFFFFFFFF) >> sa)
+            return next_pc
+    elif cls is InstructionShiftWordRightArithmetic:
+        def run(sel, rows):
+            R[sel, rd] = wrap(R[sel, rt]) >> sa
+            return next_pc
+    elif cls is InstructionAnd:
+        def run(sel, rows):
+            R[sel, rd] = R[sel, rs] & R[sel, rt]
+            return next_pc
+    elif cls is InstructionNotOr:
+        def run(sel, rows):
+            R[sel, rd] = ~(R[sel, rs] | R[sel, rt])
+            return next_pc
+    elif cls is InstructionMulWord:
+        def run(sel, rows):
+            R[sel, rd] = wrap(R[sel, rs] * R[sel, rt])
+            return next_pc
+    elif cls is InstructionSubtractWord:
+        def run(sel, rows):
+            R[sel, rd] = R[sel, rs] - R[sel, rt]
+            return next_pc
+    elif cls is InstructionAddWord:
+        def run(sel, rows):
+            R[sel, rd] = R[sel, rs] + R[sel, rt]
+            return next_pc
+    elif cls is InstructionSetOnLessThan:
+        def run(sel, rows):
+            R[sel, rd] = R[sel, rs] < R[sel, rt]
+            return next_pc
+    # category 2 ALU instructions, rt <- rs op immediate
+    elif cls in (InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2,
+                 InstructionSetOnLessThan2):
+        imm = inst.imm_val
+        if cls is InstructionAddWord2:
+            def run(sel, rows):
+                R[sel, rt] = R[sel, rs] + imm
+                return next_pc
+        elif cls is InstructionSubWord2:
+            def run(sel, rows):
+                R[sel, rt] = R[sel, rs] - imm
+                return next_pc
+        elif cls is InstructionMulWord2:
+            def run(sel, rows):
+                R[sel, rt] = wrap(R[sel, rs] * imm)
+                return next_pc
+        elif cls is InstructionAnd2:
+            def run(sel, rows):
+                R[sel, rt] = R[sel, rs] & imm
+                return next_pc
+        else:
+            def run(sel, rows):
+                R[sel, rt] = R[sel, rs] < imm
+                return next_pc
+    else:
+        raise RuntimeError('no batched code for ' + cls.__name__)
+    return run
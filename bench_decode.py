@@ -0,0 +1,90 @@
+import argparse as ap
+import os
+import subprocess
+import sys
+import time
+import types
+import mips32
+from mips32 import Instruction
+
+parser = ap.ArgumentParser(description='Decode throughput benchmark for mips32')
+parser.add_argument('--input', type=str, default='tests4pipeline/sample.txt',
+                    help="path of input file, the instructions before BREAK are repeated to build the workload")
+parser.add_argument('--count', type=int, default=1000000,
+                    help="number of instructions to decode")
+parser.add_argument('--cache', type=int, default=4096,
+                    help="size of the DecodeCache for the cached run")
+parser.add_argument('--repeat', type=int, default=3,
+                    help="number of timed runs, the best one is reported")
+parser.add_argument('--reference', type=str, default=None,
+                    help="git revision of the mips32.py timed as the 'before' string decoder, e.g. the commit before "
+                         "the bit-field decoder. No reference run without it")
+
+
+def load_words(in_file_path):
+    instr_strs = []
+    with open(in_file_path, 'r') as file_in:
+        for read_buf in file_in.readlines():
+            read_buf = read_buf.strip()
+            instr_strs.append(read_buf)
+            if Instruction(instr_str=read_buf).is_break():
+                break
+    return instr_strs
+
+
+def load_reference(rev):
+    """
+    import mips32.py of a git revision as the module mips32_reference, the 'string' run of the current tree already
+    goes through the new decoder, the reference gives the numbers before it
+    :param rev: git revision
+    :return: module
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    source = subprocess.run(['git', 'show', rev + ':mips32.py'], cwd=repo_dir, capture_output=True, text=True,
+                            check=True).stdout
+    module = types.ModuleType('mips32_reference')
+    # the old decoder finds its classes with __import__(__name__)
+    sys.modules[module.__name__] = module
+    exec(compile(source, '{}:mips32.py'.format(rev), 'exec'), module.__dict__)
+    return module
+
+
+def bench(decode, workload, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        PC = 64
+        for item in workload:
+            decode(item, PC)
+            PC += 4
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None or elapsed < best else best
+    return best
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    instr_strs = load_words(args.input)
+    instr_strs = (instr_strs * (args.count // len(instr_strs) + 1))[:args.count]
+
+    results = []
+    if args.reference is not None:
+        try:
+            reference = load_reference(args.reference)
+            reference_decode = reference.Instruction
+        except (OSError, subprocess.CalledProcessError, SyntaxError, ImportError, AttributeError) as e:
+            print('reference decoder of {} not available: {}: {}'.format(args.reference, e.__class__.__name__, e))
+        else:
+            results.append(('reference', bench(lambda s, pc: reference_decode(instr_str=s, pc_val=pc), instr_strs,
+                                               args.repeat)))
+    results.append(('string', bench(lambda s, pc: Instruction(instr_str=s, pc_val=pc), instr_strs, args.repeat)))
+    if hasattr(Instruction, 'from_word'):
+        words = [int(s, 2) for s in instr_strs]
+        results.append(('word', bench(Instruction.from_word, words, args.repeat)))
+    if hasattr(mips32, 'DecodeCache'):
+        cache = mips32.DecodeCache(maxsize=args.cache)
+        results.append(('cached', bench(lambda w, pc: Instruction.from_word(w, pc, cache=cache), words, args.repeat)))
+
+    for name, elapsed in results:
+        print('{:10}{:>10} instr in {:.3f}s\t{:.0f} instr/s'.format(
+            name, args.count, elapsed, args.count / elapsed))
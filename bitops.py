@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+MASK32 = 0xFFFFFFFF
+
+
+def sign_extend(val, bits=16):
+    """
+    interpret the low bits of an unsigned integer as a two's complement value, e.g. the 16 bits immediate.
+    :param val: unsigned integer value
+    :param bits: bit length of the two's complement field
+    :return: signed integer value
+    """
+    sign_bit = 1 << (bits - 1)
+    return (val & (sign_bit - 1)) - (val & sign_bit)
+
+
+def to_signed32(val):
+    """
+    wrap the integer value to a signed 32-bit register value.
+    :param val: integer value, only the low 32 bits are kept
+    :return: signed integer value
+    """
+    return sign_extend(val & MASK32, 32)
+
+
+def sll(val, sa):
+    """
+    SLL: shift the 32-bit word left, inserting zeros into the emptied bits.
+    :param val: register value
+    :param sa: shift amount
+    :return: signed integer value
+    """
+    return to_signed32(val << sa)
+
+
+def srl(val, sa):
+    """
+    SRL: shift the 32-bit word right, inserting zeros into the emptied bits.
+    :param val: register value
+    :param sa: shift amount
+    :return: signed integer value
+    """
+    return to_signed32((val & MASK32) >> sa)
+
+
+def sra(val, sa):
+    """
+    SRA: shift the 32-bit word right, duplicating the sign bit into the emptied bits.
+    :param val: register value
+    :param sa: shift amount
+    :return: signed integer value
+    """
+    return to_signed32(val) >> sa
+
+
+def mul32(val1, val2):
+    """
+    MUL: the least significant 32 bits of the product of the two signed words.
+    :param val1: register value
+    :param val2: register value or immediate
+    :return: signed integer value
+    """
+    return to_signed32(val1 * val2)
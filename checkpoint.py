@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from array import array
+import struct
+import sys
+from memory import PAGE_WORDS
+
+# magic, version, PC, executed instructions, base and number of words of the data section, number of pages
+_HEADER = struct.Struct('>8sHIQIII')
+_REGISTERS = struct.Struct('>32q')
+_PAGE_NUM = struct.Struct('>I')
+CHECKPOINT_MAGIC = b'MIPSCKPT'
+CHECKPOINT_VERSION = 1
+
+
+class Checkpoint:
+    """
+    Architectural state of a functional run: PC, registers and the touched pages of the data segment. The data
+    section base and size are kept to print the data segment like the simulators do.
+    """
+
+    def __init__(self, pc, instructions, registers, data_base, data_size, pages):
+        self.pc = pc
+        self.instructions = instructions
+        self.registers = registers
+        self.data_base = data_base
+        self.data_size = data_size
+        self.pages = pages
+
+    def __str__(self):
+        return 'PC: {}, instructions: {}, pages: {}'.format(self.pc, self.instructions, len(self.pages))
+
+
+def save_checkpoint(path, pc, instructions, registers, data_segment):
+    """
+    write the checkpoint file. Pages filled with zeros are skipped, they read back as untouched memory.
+    :param path: path of the checkpoint file
+    :param pc: PC of the next instruction to execute
+    :param instructions: number of instructions executed so far
+    :param registers: list of the 32 register values
+    :param data_segment: DataSegment of the simulator
+    """
+    pages = [(page_num, words) for page_num, words in data_segment.pages() if any(words)]
+    try:
+        regs_buf = _REGISTERS.pack(*registers)
+    except struct.error:
+        raise RuntimeError('register values do not fit the 64-bit checkpoint fields')
+    with open(path, 'wb') as file_out:
+        file_out.write(_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, pc, instructions,
+                                    data_segment.base, data_segment.size, len(pages)))
+        file_out.write(regs_buf)
+        for page_num, words in pages:
+            words = array('i', words)
+            if sys.byteorder == 'little':
+                words.byteswap()
+            file_out.write(_PAGE_NUM.pack(page_num))
+            file_out.write(words.tobytes())
+
+
+def load_checkpoint(path):
+    """
+    :param path: path of the checkpoint file
+    :return: Checkpoint
+    """
+    with open(path, 'rb') as file_in:
+        magic, version, pc, instructions, data_base, data_size, page_cnt = _HEADER.unpack(
+            file_in.read(_HEADER.size))
+        if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+            raise RuntimeError('{} is not a version {} checkpoint file'.format(path, CHECKPOINT_VERSION))
+        registers = list(_REGISTERS.unpack(file_in.read(_REGISTERS.size)))
+        pages = []
+        for _ in range(page_cnt):
+            page_num, = _PAGE_NUM.unpack(file_in.read(_PAGE_NUM.size))
+            words = array('i')
+            words.frombytes(file_in.read(PAGE_WORDS * words.itemsize))
+            if sys.byteorder == 'little':
+                words.byteswap()
+            pages.append((page_num, words))
+    return Checkpoint(pc, instructions, registers, data_base, data_size, pages)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from array import array
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_WORDS = PAGE_SIZE >> 2
+MAX_ADDR = 0xFFFFFFFF
+
+
+class PagedMemory:
+    """
+    Sparse word memory of the 32-bit address space, split into 4 KiB pages of array('i'). A page is allocated
+    zero filled on the first store into it, loads from untouched pages return 0.
+    Clones share their pages copy-on-write: a page is copied the first time an instance stores into a page it
+    does not own, thus clone() costs O(touched pages) instead of a copy of all the memory.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        # pages this instance may store into in place
+        self._owned = {}
+
+    def __deepcopy__(self, memo):
+        return self.clone()
+
+    def clone(self):
+        """
+        :return: copy of the memory sharing the pages copy-on-write
+        """
+        other = self.__class__.__new__(self.__class__)
+        other.__dict__.update(self.__dict__)
+        other.share_pages(self)
+        return other
+
+    def share_pages(self, other):
+        """
+        make the content of this memory a copy-on-write copy of the other memory
+        :param other: PagedMemory
+        """
+        self._pages = dict(other._pages)
+        self._owned = {}
+        # the pages are shared from now on, the next store of the other memory copies them as well
+        other._owned = {}
+
+    @property
+    def page_count(self):
+        return len(self._pages)
+
+    def pages(self):
+        """
+        :return: list of (page number, array of the page words) of the touched pages, ordered by page number
+        """
+        return sorted(self._pages.items())
+
+    def load_pages(self, pages):
+        """
+        replace the content of the memory by copies of the given pages
+        :param pages: iterable of (page number, sequence of PAGE_WORDS words)
+        """
+        self._pages = {}
+        self._owned = {}
+        for page_num, words in pages:
+            if len(words) != PAGE_WORDS:
+                raise RuntimeError('page {} has {} words instead of {}'.format(page_num, len(words), PAGE_WORDS))
+            self._pages[page_num] = self._owned[page_num] = array('i', words)
+
+    def mem_write(self, mem_addr: int, value: int):
+        if mem_addr & 3 or not 0 <= mem_addr <= MAX_ADDR:
+            raise Exception('Memory address out of range!')
+        page = self._owned.get(mem_addr >> PAGE_SHIFT)
+        if page is None:
+            page = self._own_page(mem_addr >> PAGE_SHIFT)
+        idx = (mem_addr & (PAGE_SIZE - 1)) >> 2
+        try:
+            page[idx] = value
+        except OverflowError:
+            # registers may hold wider values after ADD or SUB, the 32-bit pages cannot store them as they are
+            raise Exception('Memory value out of 32-bit range!')
+
+    def mem_read(self, mem_addr: int) -> int:
+        if mem_addr & 3:
+            raise Exception('Memory address out of range!')
+        page = self._pages.get(mem_addr >> PAGE_SHIFT)
+        if page is None:
+            if not 0 <= mem_addr <= MAX_ADDR:
+                raise Exception('Memory address out of range!')
+            return 0
+        return page[(mem_addr & (PAGE_SIZE - 1)) >> 2]
+
+    def _own_page(self, page_num):
+        shared = self._pages.get(page_num)
+        page = array('i', [0]) * PAGE_WORDS if shared is None else shared[:]
+        self._pages[page_num] = self._owned[page_num] = page
+        return page
+
+
+class DataSegment(PagedMemory):
+    """
+    Data Segment of the memory. Starts from the end of the BREAK of the program and until the end of the file.
+    The memory is paged, stores may go anywhere in the 32-bit address space, only the words of the data section
+    are printed.
+    """
+
+    def __init__(self, data_mem):
+        """
+        :param data_mem: dict of the Data keyed by their consecutive addresses
+        """
+        super().__init__()
+        self.base = next(iter(data_mem), 0)
+        self.size = len(data_mem)
+        self.print_width = 8
+        if list(data_mem) != list(range(self.base, self.base + 4 * self.size, 4)):
+            raise RuntimeError('Data segment addresses are not consecutive words')
+        for mem_addr, data in data_mem.items():
+            self.mem_write(mem_addr, data.int_val)
+
+    def __str__(self):
+        desc_str = 'Data'
+        for idx in range(self.size):
+            if idx % self.print_width == 0:
+                desc_str += '\n{}:'.format(self.base + 4 * idx)
+            desc_str += '\t{}'.format(self.mem_read(self.base + 4 * idx))
+        return desc_str + '\n'
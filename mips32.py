@@ -2,6 +2,9 @@
 
 from enum import Enum, unique
 from abc import abstractmethod
+from collections import OrderedDict
+from functools import cached_property
+from bitops import sign_extend
 
 class Data:
     def __init__(self, data_str="0", endian='big', pc_val=148):
@@ -9,6 +12,20 @@ class Data:
         self.pc_val = pc_val
         self.int_val = signed_str_to_int(self.data_str)
 
+    @classmethod
+    def from_word(cls, word, pc_val=148):
+        """
+        build the data straight from the 32-bit word.
+        :param word: data word as an unsigned 32-bit integer
+        :param pc_val: address of the data
+        :return: Data
+        """
+        data = cls.__new__(cls)
+        data.data_str = format(word, '032b')
+        data.pc_val = pc_val
+        data.int_val = sign_extend(word, 32)
+        return data
+
     def __str__(self):
         return '{}\t{}\t{}'.format(self.data_str, str(self.pc_val), str(self.int_val))
 
@@ -40,17 +57,6 @@ class Instruction:
         type_2 = 4
         type_unknown = 5
 
-        @classmethod
-        def get_type(cls, opcode):
-            _inst_dict = {'000010': cls.type_j,
-                          '101011': cls.type_i, '100011': cls.type_i, '000100': cls.type_i, '000101': cls.type_i, '000001': cls.type_i, '000111': cls.type_i, '000110': cls.type_i, '001000': cls.type_i, '001001': cls.type_i,
-                          '001010': cls.type_i,
-                          '000000': cls.type_r, '011100': cls.type_r,
-                          '110000': cls.type_2, '110001': cls.type_2, '100001': cls.type_2, '110010': cls.type_2, '110011': cls.type_2,
-                          '110101': cls.type_2}
-
-            return _inst_dict[opcode]
-
     class _InstSet(Enum):
         # detail instructions for different types here, follow the format as the DummyInstruction below
         # INSTR_001000 = ('DummyInstruction', 'SW')
@@ -61,39 +67,90 @@ class Instruction:
 
         @property
         def get_instr_class(self):
-            mod = __import__(__name__)
-            return getattr(mod, self.class_name)
-
-    def __init__(self, instr_str, endian='big', pc_val=64):
-        self.instr_str = instr_str
-        self.opcode = self.instr_str[0:6]
-        self.type = Instruction._Types.get_type(opcode=self.opcode)
+            return globals()[self.class_name]
+
+    def __new__(cls, instr_str=None, endian='big', pc_val=64):
+        # the concrete subclass comes from the dispatch table, so the string constructor returns it directly
+        if instr_str is None:  # copy and pickle create the object without arguments
+            return object.__new__(cls)
+        return Instruction.from_word(int(instr_str, 2), pc_val)
+
+    @classmethod
+    def from_word(cls, word, pc_val=64, cache=None):
+        """
+        decode the instruction straight from the 32-bit instruction word instead of the '0'/'1' string.
+        :param word: instruction word as an unsigned 32-bit integer
+        :param pc_val: address of the instruction
+        :param cache: optional DecodeCache, the decoded fields are then shared with the other copies of the word
+        :return: instance of the concrete Instruction subclass
+        """
+        if cache is not None:
+            return cache.place(word, pc_val)
+        return Instruction.from_entry(word, pc_val, lookup_instr(word))
+
+    @staticmethod
+    def from_entry(word, pc_val, entry):
+        """
+        decode the instruction of a word whose class was already looked up.
+        :param word: instruction word as an unsigned 32-bit integer
+        :param pc_val: address of the instruction
+        :param entry: (class, instr_code) tuple of the word, see lookup_instr
+        :return: instance of the concrete Instruction subclass
+        """
+        instr_class, instr_code = entry
+        inst = object.__new__(instr_class)
+        inst.instr_code = instr_code
+        inst._decode_word(word, pc_val)
+        return inst
+
+    def _decode_word(self, word, pc_val):
+        # all the fields are pulled out with shifts and masks, the binary strings are only built on demand
+        self.word = word
+        self.op = word >> 26
+        self.rs = (word >> 21) & 0x1F
+        self.rt = (word >> 16) & 0x1F
+        self.rd = (word >> 11) & 0x1F
+        self.shamt = (word >> 6) & 0x1F
+        self.funct = word & 0x3F
+        self.imm = word & 0xFFFF
         self.pc_val = pc_val
-        self.formatted_instr_bin_str = ''
-        self.desc_str = ''
         self.dest = None
         self.op1_val = None
         self.op2_val = None
 
-        self.formatted_instr_bin_str = self.instr_str[0:6] + ' ' + self.instr_str[6:11] + ' ' + self.instr_str[11:16] \
-            + ' ' + self.instr_str[16:21] + ' ' + self.instr_str[21:26] + ' ' \
-            + self.instr_str[26:32]
-        # Dynamic binding the Instruction Type
-        if self.type is Instruction._Types.type_j:
-            self.__class__ = InstructionTypeJ
-        elif self.type is Instruction._Types.type_i:
-            self.__class__ = InstructionTypeI
-        elif self.type is Instruction._Types.type_r:
-            self.__class__ = InstructionTypeR
-        elif self.type is Instruction._Types.type_2:
-            self.__class__ = InstructionType2
-
         self._parse_instr_binary()
+        self._inst_decode()
+
+    @property
+    def instr_str(self):
+        return format(self.word, '032b')
+
+    @property
+    def opcode(self):
+        return format(self.op, '06b')
 
     @abstractmethod
     def _parse_instr_binary(self):
         pass
 
+    def _inst_decode(self):
+        # fields of the concrete instruction, the disassembly text is left to _format_desc
+        pass
+
+    @abstractmethod
+    def _format_desc(self):
+        pass
+
+    # the disassembly strings are only formatted when they are first used, pure simulation never pays for them
+    @cached_property
+    def formatted_instr_bin_str(self):
+        return '{:06b} {:05b} {:05b} {:05b} {:05b} {:06b}'.format(
+            self.op, self.rs, self.rt, self.rd, self.shamt, self.funct)
+
+    @cached_property
+    def desc_str(self):
+        return self._format_desc()
+
     def __str__(self):
         return '{}\t{}\t{}'.format(self.formatted_instr_bin_str, str(self.pc_val), self.desc_str)
 
@@ -103,6 +160,72 @@ class Instruction:
         else:
             return False
 
+    def __getattr__(self, name):
+        # instructions placed by a DecodeCache only hold pc_val, the rest is read from the shared template
+        template = self.__dict__.get('_template')
+        if template is None:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+        return getattr(template, name)
+
+
+class DecodeCache:
+    """
+    Bounded LRU cache of decoded instructions keyed on the 32-bit instruction word.
+    The cached templates are decoded without an address and shared by every copy of the word, thus they must be
+    treated as read only. place() returns an instruction which only stores pc_val and reads the rest from the template.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._templates = OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def __str__(self):
+        return 'hits: {}, misses: {}, evictions: {}, size: {}/{}'.format(
+            self.hits, self.misses, self.evictions, len(self._templates), self.maxsize)
+
+    def lookup(self, word):
+        """
+        get the shared decoded template of the word.
+        :param word: instruction word as an unsigned 32-bit integer
+        :return: Instruction template, its pc_val is None
+        """
+        template = self._templates.get(word)
+        if template is None:
+            self.misses += 1
+            template = self._templates[word] = Instruction.from_word(word, None)
+            if len(self._templates) > self.maxsize:
+                self._templates.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self._templates.move_to_end(word)
+        return template
+
+    def place(self, word, pc_val):
+        """
+        get the instruction of the word at the given address.
+        :param word: instruction word as an unsigned 32-bit integer
+        :param pc_val: address of the instruction
+        :return: instance of the concrete Instruction subclass backed by the shared template
+        """
+        template = self.lookup(word)
+        inst = object.__new__(template.__class__)
+        inst._template = template
+        inst.pc_val = pc_val
+        return inst
+
+    def clear(self):
+        self._templates.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
 
 ###############################################
 # J Type Instructions
@@ -116,17 +239,13 @@ class InstructionTypeJ(Instruction):
 
     # InstSet instr_code
 
+    type = Instruction._Types.type_j
+
     class _InstSet(Instruction._InstSet):
         INSTR_000010 = ('InstructionJump', 'J')
 
     def _parse_instr_binary(self):
         # print("J type Instruction")
-        self.instr_code = InstructionTypeJ._InstSet['INSTR_' + self.opcode]
-        self.__class__ = self.instr_code.get_instr_class
-        self._inst_decode()
-
-    @abstractmethod
-    def _inst_decode(self):
         pass
 
 
@@ -139,14 +258,15 @@ class InstructionJump(InstructionTypeJ):
     The remaining upper bits are the corresponding bits of the address of the instruction in the delay slot (not the branch itself). 
     """
 
-    target_instr_index_str = ''
-
     def _inst_decode(self):
-        self.dest = int(self.instr_str[6:32], 2) << 2
+        self.dest = (self.word & 0x3FFFFFF) << 2
+
+    @property
+    def target_instr_index_str(self):
+        return str(self.dest)
 
-        self.target_instr_index_str = str(int(self.instr_str[6:32], 2) << 2)
-        self.desc_str = '{} #{}'.format(
-            self.instr_code.abbr, self.target_instr_index_str)
+    def _format_desc(self):
+        return '{} #{}'.format(self.instr_code.abbr, self.target_instr_index_str)
 
 
 ###############################################
@@ -165,6 +285,8 @@ class InstructionTypeI(Instruction):
     # register_t = ''
     # offset = target = ''
 
+    type = Instruction._Types.type_i
+
     class _InstSet(Instruction._InstSet):
         INSTR_101011 = ('InstructionStoreWord', 'SW')
         INSTR_100011 = ('InstructionLoadWord', 'LW')
@@ -174,27 +296,31 @@ class InstructionTypeI(Instruction):
 
     def _parse_instr_binary(self):
         # print("I type Instruction")
+        self.op1_val = self.rs
+        self.op2_val = self.rt
+
+    # binary string fields, kept for the callers which still work on the strings
+    @property
+    def register_s(self):
+        return format(self.rs, '05b')
+
+    @property
+    def register_t(self):
+        return format(self.rt, '05b')
+
+    @property
+    def offset(self):
         # offset variable is for convenience.
-        self.register_s = self.instr_str[6:11]
-        self.register_t = self.instr_str[11:16]
-        self.offset = self.instr_str[16:32]
-        self.target = self.offset
-        
-        self.op1_val = int(self.register_s, 2)
-        self.op2_val = int(self.register_t, 2)
-
-        if self.opcode == '000001':
-            self.instr_code = InstructionTypeI._InstSet['INSTR_' +
-                                                        self.opcode + '_' + self.register_t]
-        else:
-            self.instr_code = InstructionTypeI._InstSet['INSTR_' + self.opcode]
+        return format(self.imm, '016b')
 
-        self.__class__ = self.instr_code.get_instr_class
-        self._inst_decode()
+    @property
+    def target(self):
+        return self.offset
 
-    @abstractmethod
-    def _inst_decode(self):
-        pass
+    @property
+    def base(self):
+        # base register of SW, LW
+        return self.register_s
 
 
 class InstructionLoadWord(InstructionTypeI):
@@ -209,13 +335,12 @@ class InstructionLoadWord(InstructionTypeI):
     """
 
     def _inst_decode(self):
-        self.base = self.register_s
-        self.dest = int(self.register_t, 2)
-        self.op1_val = int(self.offset, 2)
-        self.op2_val = int(self.base, 2)
+        self.dest = self.rt
+        self.op1_val = self.imm
+        self.op2_val = self.rs
 
-        self.desc_str = '{} R{}, {}(R{})'.format(self.instr_code.abbr, int(self.register_t, 2), int(self.offset, 2),
-                                                 int(self.base, 2))
+    def _format_desc(self):
+        return '{} R{}, {}(R{})'.format(self.instr_code.abbr, self.rt, self.imm, self.rs)
 
 
 class InstructionStoreWord(InstructionTypeI):
@@ -229,13 +354,12 @@ class InstructionStoreWord(InstructionTypeI):
     """
 
     def _inst_decode(self):
-        self.base = self.register_s
-        self.dest = int(self.register_t, 2)  # data to be stored
-        self.op1_val = int(self.offset, 2)  # base, which is a const
-        self.op2_val = int(self.base, 2)  # dest offset from reg
+        self.dest = self.rt  # data to be stored
+        self.op1_val = self.imm  # base, which is a const
+        self.op2_val = self.rs  # dest offset from reg
 
-        self.desc_str = '{} R{}, {}(R{})'.format(self.instr_code.abbr, int(self.register_t, 2), int(self.offset, 2),
-                                                 int(self.base, 2))
+    def _format_desc(self):
+        return '{} R{}, {}(R{})'.format(self.instr_code.abbr, self.rt, self.imm, self.rs)
 
 
 class InstructionBranchOnEqual(InstructionTypeI):
@@ -252,12 +376,12 @@ class InstructionBranchOnEqual(InstructionTypeI):
     """
 
     def _inst_decode(self):
-        self.op1_val = int(self.register_s, 2)
-        self.op2_val = int(self.register_t, 2)
-        self.dest = signed_str_to_int(self.offset) << 2
+        self.op1_val = self.rs
+        self.op2_val = self.rt
+        self.dest = sign_extend(self.imm) << 2
 
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_s, 2),
-                                                  int(self.register_t, 2), signed_str_to_int(self.offset) << 2)
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rs, self.rt, self.dest)
 
 
 class InstructionBranchOnGreaterThanZero(InstructionTypeI):
@@ -273,9 +397,8 @@ class InstructionBranchOnGreaterThanZero(InstructionTypeI):
     P.S. Left Shift 2 bits
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, #{}'.format(self.instr_code.abbr, int(self.register_s, 2),
-                                             signed_str_to_int(self.offset) << 2)
+    def _format_desc(self):
+        return '{} R{}, #{}'.format(self.instr_code.abbr, self.rs, sign_extend(self.imm) << 2)
 
 
 class InstructionBranchOnLessThanZero(InstructionTypeI):
@@ -291,9 +414,8 @@ class InstructionBranchOnLessThanZero(InstructionTypeI):
     P.S. !!!!!! same opcode as BGEZ. Left Shift 2 bits
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, #{}'.format(self.instr_code.abbr, int(self.register_s, 2),
-                                             signed_str_to_int(self.offset) << 2)
+    def _format_desc(self):
+        return '{} R{}, #{}'.format(self.instr_code.abbr, self.rs, sign_extend(self.imm) << 2)
 
 
 ###############################################
@@ -320,6 +442,8 @@ class InstructionTypeR(Instruction):
     # shift_amount = ''
     # func_code = ''
 
+    type = Instruction._Types.type_r
+
     class _InstSet(Instruction._InstSet):
         INSTR_100000 = ('InstructionAddWord', 'ADD')
         INSTR_100010 = ('InstructionSubtractWord', 'SUB')
@@ -336,34 +460,31 @@ class InstructionTypeR(Instruction):
 
     def _parse_instr_binary(self):
         # print("R type Instruction")
-        # offset variable is for convenience.
-        self.register_s = self.instr_str[6:11]
-        self.register_t = self.instr_str[11:16]
-        self.register_d = self.instr_str[16:21]
-        self.shift_amount = self.instr_str[21:26]
-        self.func_code = self.instr_str[26:32]
-
-        self.dest = int(self.register_d, 2)
-        self.op1_val = int(self.register_s, 2)
-        self.op2_val = int(self.register_t, 2)
-        self.sa_val = int(self.shift_amount, 2)
-
-        if self.func_code == '000000':
-            if self.register_s == '00000' and self.register_t == '00000' and self.register_d == '00000' and self.shift_amount == '00000':
-                self.instr_code = InstructionTypeR._InstSet['INSTR_NOP']
-            else:
-                self.instr_code = InstructionTypeR._InstSet['INSTR_SLL']
-        elif self.func_code == '000010' and self.opcode == '011100':
-            self.instr_code = InstructionTypeR._InstSet['INSTR_MUL']
-        else:
-            self.instr_code = InstructionTypeR._InstSet['INSTR_' + self.func_code]
+        self.dest = self.rd
+        self.op1_val = self.rs
+        self.op2_val = self.rt
+        self.sa_val = self.shamt
 
-        self.__class__ = self.instr_code.get_instr_class
-        self._inst_decode()
+    # binary string fields, kept for the callers which still work on the strings
+    @property
+    def register_s(self):
+        return format(self.rs, '05b')
 
-    @abstractmethod
-    def _inst_decode(self):
-        pass
+    @property
+    def register_t(self):
+        return format(self.rt, '05b')
+
+    @property
+    def register_d(self):
+        return format(self.rd, '05b')
+
+    @property
+    def shift_amount(self):
+        return format(self.shamt, '05b')
+
+    @property
+    def func_code(self):
+        return format(self.funct, '06b')
 
 
 class InstructionAddWord(InstructionTypeR):
@@ -378,9 +499,8 @@ class InstructionAddWord(InstructionTypeR):
     • If the addition does not overflow, the 32-bit result is placed into GPR rd.
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, R{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_s, 2), int(self.register_t, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, R{}'.format(self.instr_code.abbr, self.rd, self.rs, self.rt)
 
 
 class InstructionSubtractWord(InstructionTypeR):
@@ -395,9 +515,8 @@ class InstructionSubtractWord(InstructionTypeR):
     P.S. signed, overflow
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, R{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_s, 2), int(self.register_t, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, R{}'.format(self.instr_code.abbr, self.rd, self.rs, self.rt)
 
 
 class InstructionAnd(InstructionTypeR):
@@ -410,9 +529,8 @@ class InstructionAnd(InstructionTypeR):
     placed into GPR rd.
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, R{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_s, 2), int(self.register_t, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, R{}'.format(self.instr_code.abbr, self.rd, self.rs, self.rt)
 
 
 class InstructionNotOr(InstructionTypeR):
@@ -425,9 +543,8 @@ class InstructionNotOr(InstructionTypeR):
     placed into GPR rd.
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, R{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_s, 2), int(self.register_t, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, R{}'.format(self.instr_code.abbr, self.rd, self.rs, self.rt)
 
 
 class InstructionShiftWordLeftLogical(InstructionTypeR):
@@ -442,9 +559,8 @@ class InstructionShiftWordLeftLogical(InstructionTypeR):
     P.S. Same func_code as NOP
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_t, 2), int(self.shift_amount, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rd, self.rt, self.shamt)
 
 
 class InstructionShiftWordRightLogical(InstructionTypeR):
@@ -458,9 +574,8 @@ class InstructionShiftWordRightLogical(InstructionTypeR):
     the word result is placed in GPR rd. The bit-shift amount is specified by sa.
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_t, 2), int(self.shift_amount, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rd, self.rt, self.shamt)
 
 
 class InstructionShiftWordRightArithmetic(InstructionTypeR):
@@ -474,9 +589,8 @@ class InstructionShiftWordRightArithmetic(InstructionTypeR):
     emptied bits; the word result is placed in GPR rd. The bit-shift amount is specified by sa.
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_t, 2), int(self.shift_amount, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rd, self.rt, self.shamt)
 
 
 class InstructionJumpRegister(InstructionTypeR):
@@ -489,9 +603,8 @@ class InstructionJumpRegister(InstructionTypeR):
     For processors that implement the MIPS16e ASE, set the ISA Mode bit to the value in GPR rs bit 0. Bit 0 of the target address is always zero so that no Address Exceptions occur when bit 0 of the source register is one
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}'.format(
-            self.instr_code.abbr, int(self.register_s, 2))
+    def _format_desc(self):
+        return '{} R{}'.format(self.instr_code.abbr, self.rs)
 
 
 class InstructionMulWord(InstructionTypeR):
@@ -505,9 +618,8 @@ class InstructionMulWord(InstructionTypeR):
     LO are UNPREDICTABLE after the operation. No arithmetic exception occurs under any circumstances.
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, R{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_s, 2), int(self.register_t, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, R{}'.format(self.instr_code.abbr, self.rd, self.rs, self.rt)
 
 
 class InstructionSetOnLessThan(InstructionTypeR):
@@ -522,9 +634,8 @@ class InstructionSetOnLessThan(InstructionTypeR):
     P.S. rs and rd are SIGNED integers
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, R{}'.format(self.instr_code.abbr, int(self.register_d, 2),
-                                                  int(self.register_s, 2), int(self.register_t, 2))
+    def _format_desc(self):
+        return '{} R{}, R{}, R{}'.format(self.instr_code.abbr, self.rd, self.rs, self.rt)
 
 
 class InstructionNoOperation(InstructionTypeR):
@@ -538,8 +649,8 @@ class InstructionNoOperation(InstructionTypeR):
     SLL r0, r0, 0.
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{}'.format(self.instr_code.abbr)
+    def _format_desc(self):
+        return '{}'.format(self.instr_code.abbr)
 
 
 class InstructionBreakpoint(InstructionTypeR):
@@ -552,10 +663,12 @@ class InstructionBreakpoint(InstructionTypeR):
     loading the contents of the memory word containing the instruction.
     """
 
-    def _inst_decode(self):
-        self.code = self.register_s + self.register_t + self.register_d
+    def _format_desc(self):
+        return '{}'.format(self.instr_code.abbr)
 
-        self.desc_str = '{}'.format(self.instr_code.abbr)
+    @property
+    def code(self):
+        return self.register_s + self.register_t + self.register_d
 
 
 ###############################################
@@ -576,6 +689,8 @@ class InstructionType2(Instruction):
     # register_t = ''
     # immediate = ''
 
+    type = Instruction._Types.type_2
+
     class _InstSet(Instruction._InstSet):
         INSTR_110000 = ('InstructionAddWord2', 'ADD')
         INSTR_110001 = ('InstructionSubWord2', 'SUB')
@@ -586,22 +701,22 @@ class InstructionType2(Instruction):
 
     def _parse_instr_binary(self):
         # print("Category 2 type Instruction")
-        # offset variable is for convenience.
-        self.register_s = self.instr_str[6:11]
-        self.register_t = self.instr_str[11:16]
-        self.immediate = self.instr_str[16:32]
+        self.op1_val = self.rs
+        self.dest = self.rt
+        self.imm_val = self.imm
 
-        self.op1_val = int(self.register_s, 2)
-        self.dest = int(self.register_t, 2)
-        self.imm_val = int(self.immediate, 2)
+    # binary string fields, kept for the callers which still work on the strings
+    @property
+    def register_s(self):
+        return format(self.rs, '05b')
 
-        self.instr_code = InstructionType2._InstSet['INSTR_' + self.opcode]
-        self.__class__ = self.instr_code.get_instr_class
-        self._inst_decode()
+    @property
+    def register_t(self):
+        return format(self.rt, '05b')
 
-    @abstractmethod
-    def _inst_decode(self):
-        pass
+    @property
+    def immediate(self):
+        return format(self.imm, '016b')
 
 
 class InstructionAddWord2(InstructionType2):
@@ -612,9 +727,8 @@ class InstructionAddWord2(InstructionType2):
     Desc: rt ← rs + immediate
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_t, 2),
-                                                  int(self.register_s, 2), signed_str_to_int(self.immediate))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rt, self.rs, sign_extend(self.imm))
 
 
 class InstructionSubWord2(InstructionType2):
@@ -625,9 +739,8 @@ class InstructionSubWord2(InstructionType2):
     Desc: rt ← rs - immediate
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_t, 2),
-                                                  int(self.register_s, 2), signed_str_to_int(self.immediate))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rt, self.rs, sign_extend(self.imm))
 
 
 class InstructionMulWord2(InstructionType2):
@@ -638,9 +751,8 @@ class InstructionMulWord2(InstructionType2):
     Desc: rt ← rs * immediate
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_t, 2),
-                                                  int(self.register_s, 2), signed_str_to_int(self.immediate))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rt, self.rs, sign_extend(self.imm))
 
 
 class InstructionAnd2(InstructionType2):
@@ -651,9 +763,8 @@ class InstructionAnd2(InstructionType2):
     Desc: rt ← rs & immediate
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_t, 2),
-                                                  int(self.register_s, 2), signed_str_to_int(self.immediate))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rt, self.rs, sign_extend(self.imm))
 
 
 class InstructionSetOnLessThan2(InstructionType2):
@@ -664,9 +775,198 @@ class InstructionSetOnLessThan2(InstructionType2):
     Desc: rt ← (rs < immediate)
     """
 
-    def _inst_decode(self):
-        self.desc_str = '{} R{}, R{}, #{}'.format(self.instr_code.abbr, int(self.register_t, 2),
-                                                  int(self.register_s, 2), signed_str_to_int(self.immediate))
+    def _format_desc(self):
+        return '{} R{}, R{}, #{}'.format(self.instr_code.abbr, self.rt, self.rs, sign_extend(self.imm))
+
+
+###############################################
+# Dispatch table
+###############################################
+# SPECIAL and SPECIAL2 opcodes are told apart by the function code, REGIMM by the rt field,
+# all the other opcodes by the opcode alone.
+_FUNCT_OPCODES = (0b000000, 0b011100)
+_RT_OPCODES = (0b000001, )
+
+
+def _build_dispatch_table():
+    """
+    map (opcode, discriminator) to the concrete Instruction subclass and its InstSet entry.
+    Built once at import from the InstSet of each type. Entries whose class is not implemented are left out,
+    decoding them raises KeyError as any other unknown instruction.
+    :return: dict of (opcode, discriminator) -> (class, instr_code)
+    """
+    table = {}
+
+    def add_entry(opcode, discriminator, instr_code):
+        if instr_code.class_name in globals():
+            table[(opcode, discriminator)] = (instr_code.get_instr_class, instr_code)
+
+    for instr_set in (InstructionTypeJ._InstSet, InstructionType2._InstSet):
+        for instr_code in instr_set:
+            add_entry(int(instr_code.name[6:12], 2), 0, instr_code)
+    for instr_code in InstructionTypeI._InstSet:
+        opcode = int(instr_code.name[6:12], 2)
+        add_entry(opcode, int(instr_code.name[13:18], 2) if opcode in _RT_OPCODES else 0, instr_code)
+    for instr_code in InstructionTypeR._InstSet:
+        if instr_code.name in ('INSTR_NOP', 'INSTR_MUL'):
+            continue
+        funct = 0b000000 if instr_code.name == 'INSTR_SLL' else int(instr_code.name[6:12], 2)
+        for opcode in _FUNCT_OPCODES:
+            add_entry(opcode, funct, instr_code)
+    # MUL shares the function code with SRL, only the opcode tells them apart
+    add_entry(0b011100, 0b000010, InstructionTypeR._InstSet.INSTR_MUL)
+    return table
+
+
+_DISPATCH_TABLE = _build_dispatch_table()
+_NOP_ENTRY = (InstructionNoOperation, InstructionTypeR._InstSet.INSTR_NOP)
+
+
+def lookup_instr(word):
+    """
+    find the concrete Instruction subclass of the 32-bit instruction word.
+    :param word: instruction word as an unsigned 32-bit integer
+    :return: (class, instr_code) tuple
+    """
+    opcode = word >> 26
+    if opcode in _FUNCT_OPCODES:
+        if word & 0x3FFFFFF == 0:  # SLL with all the fields 0
+            return _NOP_ENTRY
+        return _DISPATCH_TABLE[(opcode, word & 0x3F)]
+    elif opcode in _RT_OPCODES:
+        return _DISPATCH_TABLE[(opcode, (word >> 16) & 0x1F)]
+    return _DISPATCH_TABLE[(opcode, 0)]
+
+
+###############################################
+# Vectorized bulk disassembly
+###############################################
+# operand text of each instruction for the bulk disassembler, must be kept in line with _format_desc
+_BULK_DESC_FORMATS = {
+    InstructionJump: (' #{}', ('target', )),
+    InstructionLoadWord: (' R{}, {}(R{})', ('rt', 'imm', 'rs')),
+    InstructionStoreWord: (' R{}, {}(R{})', ('rt', 'imm', 'rs')),
+    InstructionBranchOnEqual: (' R{}, R{}, #{}', ('rs', 'rt', 'branch_offset')),
+    InstructionBranchOnGreaterThanZero: (' R{}, #{}', ('rs', 'branch_offset')),
+    InstructionBranchOnLessThanZero: (' R{}, #{}', ('rs', 'branch_offset')),
+    InstructionAddWord: (' R{}, R{}, R{}', ('rd', 'rs', 'rt')),
+    InstructionSubtractWord: (' R{}, R{}, R{}', ('rd', 'rs', 'rt')),
+    InstructionAnd: (' R{}, R{}, R{}', ('rd', 'rs', 'rt')),
+    InstructionNotOr: (' R{}, R{}, R{}', ('rd', 'rs', 'rt')),
+    InstructionMulWord: (' R{}, R{}, R{}', ('rd', 'rs', 'rt')),
+    InstructionSetOnLessThan: (' R{}, R{}, R{}', ('rd', 'rs', 'rt')),
+    InstructionShiftWordLeftLogical: (' R{}, R{}, #{}', ('rd', 'rt', 'shamt')),
+    InstructionShiftWordRightLogical: (' R{}, R{}, #{}', ('rd', 'rt', 'shamt')),
+    InstructionShiftWordRightArithmetic: (' R{}, R{}, #{}', ('rd', 'rt', 'shamt')),
+    InstructionJumpRegister: (' R{}', ('rs', )),
+    InstructionNoOperation: ('', ()),
+    InstructionBreakpoint: ('', ()),
+    InstructionAddWord2: (' R{}, R{}, #{}', ('rt', 'rs', 'simm')),
+    InstructionSubWord2: (' R{}, R{}, #{}', ('rt', 'rs', 'simm')),
+    InstructionMulWord2: (' R{}, R{}, #{}', ('rt', 'rs', 'simm')),
+    InstructionAnd2: (' R{}, R{}, #{}', ('rt', 'rs', 'simm')),
+    InstructionSetOnLessThan2: (' R{}, R{}, #{}', ('rt', 'rs', 'simm')),
+}
+_bulk_tables = None
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('the vectorized disassembler requires numpy')
+    return numpy
+
+
+def _build_bulk_tables(np):
+    """
+    lookup arrays equivalent to lookup_instr, they hold the index of the entry in the returned entry list
+    :return: entries, opcode lookup (64, ), funct lookup (64, 64) and rt lookup (64, 32)
+    """
+    entries = [_NOP_ENTRY]
+    op_lut = np.full(64, -1, dtype=np.int16)
+    funct_lut = np.full((64, 64), -1, dtype=np.int16)
+    rt_lut = np.full((64, 32), -1, dtype=np.int16)
+    for (opcode, discriminator), entry in _DISPATCH_TABLE.items():
+        if entry not in entries:
+            entries.append(entry)
+        if opcode in _FUNCT_OPCODES:
+            funct_lut[opcode, discriminator] = entries.index(entry)
+        elif opcode in _RT_OPCODES:
+            rt_lut[opcode, discriminator] = entries.index(entry)
+        else:
+            op_lut[opcode] = entries.index(entry)
+    return entries, op_lut, funct_lut, rt_lut
+
+
+def _bin_columns(np, words, spaced):
+    # the binary strings of all the words at once, with the blanks between the fields of an instruction
+    bits = np.unpackbits(words.astype('>u4').view(np.uint8).reshape(-1, 4), axis=1) + ord('0')
+    if spaced:
+        width = 37
+        chars = np.full((len(words), width), ord(' '), dtype=np.uint8)
+        chars[:, [pos + sum(pos >= edge for edge in (6, 11, 16, 21, 26)) for pos in range(32)]] = bits
+    else:
+        width = 32
+        chars = bits
+    text = chars.tobytes().decode('ascii')
+    return [text[pos:pos + width] for pos in range(0, len(text), width)]
+
+
+def dis_assembly_bulk(words, pc_val=64):
+    """
+    disassemble a whole image at once with numpy: the fields of all the words are extracted with array shifts and
+    masks, the instructions are classified with lookup arrays and the words after BREAK are formatted as Data.
+    The lines are the same as str() of the Instruction and Data objects.
+    :param words: sequence or numpy array of the unsigned 32-bit words
+    :param pc_val: address of the first word
+    :return: list of the disassembly lines without the line breaks
+    """
+    global _bulk_tables
+    np = _import_numpy()
+    if _bulk_tables is None:
+        _bulk_tables = _build_bulk_tables(np)
+    entries, op_lut, funct_lut, rt_lut = _bulk_tables
+
+    words = np.asarray(words, dtype=np.uint32)
+    opcode = words >> 26
+    funct = words & 0x3F
+    rt = (words >> 16) & 0x1F
+    entry_idx = op_lut[opcode]
+    is_funct = np.isin(opcode, _FUNCT_OPCODES)
+    entry_idx[is_funct] = funct_lut[opcode[is_funct], funct[is_funct]]
+    entry_idx[is_funct & ((words & 0x3FFFFFF) == 0)] = entries.index(_NOP_ENTRY)
+    is_rt = np.isin(opcode, _RT_OPCODES)
+    entry_idx[is_rt] = rt_lut[opcode[is_rt], rt[is_rt]]
+
+    is_break = entry_idx == entries.index((InstructionBreakpoint, InstructionTypeR._InstSet.INSTR_001101))
+    instr_cnt = int(np.argmax(is_break)) + 1 if is_break.any() else len(words)
+    unknown = np.flatnonzero(entry_idx[:instr_cnt] < 0)
+    if len(unknown):
+        lookup_instr(int(words[unknown[0]]))  # raises the same KeyError as the decoder
+
+    instr_words = words[:instr_cnt]
+    imm = (instr_words & 0xFFFF).astype(np.int32)
+    simm = np.where(imm >= 0x8000, imm - 0x10000, imm)
+    fields = {'rs': (instr_words >> 21) & 0x1F, 'rt': rt[:instr_cnt], 'rd': (instr_words >> 11) & 0x1F,
+              'shamt': (instr_words >> 6) & 0x1F, 'imm': imm, 'simm': simm, 'branch_offset': simm << 2,
+              'target': (instr_words & 0x3FFFFFF).astype(np.int64) << 2}
+    pcs = list(range(pc_val, pc_val + 4 * len(words), 4))
+    lines = _bin_columns(np, instr_words, True)
+    instr_entry_idx = entry_idx[:instr_cnt]
+    for idx in np.unique(instr_entry_idx).tolist():
+        instr_class, instr_code = entries[idx]
+        desc_format, names = _BULK_DESC_FORMATS[instr_class]
+        positions = np.flatnonzero(instr_entry_idx == idx)
+        columns = [fields[name][positions].tolist() for name in names]
+        for pos, *values in zip(positions.tolist(), *columns):
+            lines[pos] = '{}\t{}\t{}{}'.format(lines[pos], pcs[pos], instr_code.abbr, desc_format.format(*values))
+
+    data_words = words[instr_cnt:]
+    data_strs = _bin_columns(np, data_words, False)
+    for data_str, pc, int_val in zip(data_strs, pcs[instr_cnt:], data_words.view(np.int32).tolist()):
+        lines.append('{}\t{}\t{}'.format(data_str, pc, int_val))
+    return lines
 
 
 def signed_str_to_int(bin_str='0' * 32):
@@ -1,8 +1,11 @@
-from mips32 import Instruction, InstructionJump, InstructionJumpRegister, InstructionBranchOnEqual, InstructionBranchOnGreaterThanZero, InstructionBranchOnLessThanZero, InstructionStoreWord, InstructionLoadWord, InstructionShiftWordLeftLogical, InstructionShiftWordRightLogical, InstructionShiftWordRightArithmetic, InstructionAnd, InstructionNotOr, InstructionMulWord, InstructionSubtractWord, InstructionAddWord, InstructionSetOnLessThan, InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2, InstructionSetOnLessThan2, InstructionNoOperation, InstructionBreakpoint, signed_str_to_int
+from mips32 import Instruction, InstructionJump, InstructionJumpRegister, InstructionBranchOnEqual, InstructionBranchOnGreaterThanZero, InstructionBranchOnLessThanZero, InstructionStoreWord, InstructionLoadWord, InstructionShiftWordLeftLogical, InstructionShiftWordRightLogical, InstructionShiftWordRightArithmetic, InstructionAnd, InstructionNotOr, InstructionMulWord, InstructionSubtractWord, InstructionAddWord, InstructionSetOnLessThan, InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2, InstructionSetOnLessThan2, InstructionNoOperation, InstructionBreakpoint, sign_extend
 from collections import OrderedDict
 from enum import Enum
 import copy
-from utils import int_to_16bitstr
+import math
+from bitops import sll, srl, sra, mul32
+from memory import DataSegment
+from checkpoint import load_checkpoint
 
 
 class _InstTypes(Enum):
@@ -55,23 +58,11 @@ class _PipelineInstEntry:
         return inst_type
 
 
-# maintain the register result status table
-# There are only two function unit namely alu and alub, and mem
-# thus, register is either allocated in alu or alub or mem
-class _RegisterAllocationUnit:
-    def __init__(self):
-        self.inalu = False
-        self.inalub = False
-        self.inmem = False
-
-    def reset(self):
-        self.inalu = False
-        self.inalub = False
-        self.inmem = False
-
 class Pipeline:
     cycle = 0
     inst_size = 4
+    # cycles of SLL, SRL, SRA and MUL in the ALUB
+    alub_latency = 2
 
     def __init__(self, inst_mem, data_mem):
         # 0 for executed instruction, 1 for waiting instruction
@@ -86,10 +77,11 @@ class Pipeline:
 
         self.inst_mem = inst_mem
         self.RF = RegisterFile()
-        self.nextRF = copy.deepcopy(self.RF)
+        # writes of the stages during a cycle, committed to RF and DS at its end
+        self.nextRF = _RegisterJournal()
         
         self.DS = DataSegment(data_mem)
-        self.nextDS = copy.deepcopy(self.DS)
+        self.nextDS = _MemoryJournal()
 
         self.FU = FunctionalUnitStatus(self.RF, self.nextRF)
         
@@ -97,9 +89,46 @@ class Pipeline:
 
         self.pc = 64
         self.is_over = False
+        # instructions which left the fetch unit, in program order
+        self.fetched = 0
+        # state keys at the end of the previous and of the last cycle, see fast_forward
+        self._prev_key = None
+        self._key = None
+
+    @classmethod
+    def from_state(cls, inst_mem, pc, registers, memory):
+        """
+        start the pipeline from an architectural state with empty buffers, the cycles count from 0 again
+        :param inst_mem: instruction memory of the program
+        :param pc: PC of the next instruction to fetch
+        :param registers: list of the 32 register values
+        :param memory: DataSegment of the state, its pages are shared copy-on-write with the pipeline
+        :return: Pipeline
+        """
+        sim = cls(inst_mem, OrderedDict())
+        sim.RF.R[:] = registers
+        sim.DS.base, sim.DS.size = memory.base, memory.size
+        sim.DS.share_pages(memory)
+        sim.pc = pc
+        return sim
+
+    @classmethod
+    def from_checkpoint(cls, path, inst_mem):
+        """
+        start the pipeline from the state of a checkpoint with empty buffers, the cycles count from 0 again
+        :param path: path of the checkpoint file written by SimpleSim.save_checkpoint
+        :param inst_mem: instruction memory of the program of the checkpoint
+        :return: Pipeline
+        """
+        ckpt = load_checkpoint(path)
+        memory = DataSegment(OrderedDict())
+        memory.base, memory.size = ckpt.data_base, ckpt.data_size
+        memory.load_pages(ckpt.pages)
+        return cls.from_state(inst_mem, ckpt.pc, ckpt.registers, memory)
 
     def next_cycle(self):
         self.cycle += 1
+        self._prev_key, self._key = self._key, None
         
         if self.is_over:
             return
@@ -131,16 +160,60 @@ class Pipeline:
         self.PostALUB.update()
         self.PreMEM.update()
         self.PostMEM.update()
-        self.RF = self.nextRF
-        self.DS = self.nextDS
+        self.nextRF.commit(self.RF)
+        self.nextDS.commit(self.DS)
         # self.FU = self.nextFU
-        self.nextRF = copy.deepcopy(self.RF)
-        self.nextDS = copy.deepcopy(self.DS)
         # self.nextFU = copy.deepcopy(self.FU)
         
         # self.RF.snapshotStatus()
         # self.nextRF.snapshotStatus()
 
+    def fast_forward(self, max_cycles=None):
+        """
+        skip the cycles after the last one which provably repeat it: the last cycle changed nothing but the timer
+        of the instruction in the ALUB, so the next ones do the same until the instruction completes. The skipped
+        cycles are counted and have the state of the last cycle. Call it after each next_cycle, it needs the state
+        of the previous cycle.
+        :param max_cycles: do not skip beyond this cycle, None for no limit
+        :return: number of skipped cycles
+        """
+        if self.is_over:
+            return 0
+        self._key = self._state_key()
+        if self._prev_key is None or self._prev_key[0] != self._key[0]:
+            return 0
+        key, timer = self._key
+        prev_timer = self._prev_key[1]
+        limit = math.inf if max_cycles is None else max(max_cycles - self.cycle, 0)
+        if timer == prev_timer:
+            # nothing changed at all, the state repeats forever
+            if max_cycles is None:
+                raise RuntimeError('pipeline stalled at PC {} in cycle {}'.format(self.pc, self.cycle))
+            skipped = limit
+        elif prev_timer is not None and timer == prev_timer + 1:
+            skipped = min(self.alub_latency - 1 - timer, limit)
+            self.PreALUB.current_entries()[0].exec_cycle += skipped
+            self._key = (key, timer + skipped)
+        else:
+            return 0
+        self.cycle += skipped
+        return skipped
+
+    def _state_key(self):
+        """
+        :return: everything the next cycle depends on except the timer of the first instruction of the Pre-ALUB
+                 queue, and that timer. The data segment is left out, it only changes when a store leaves the
+                 Pre-MEM queue.
+        """
+        fu_entries = tuple((entry.pip_inst, entry.f_i, entry.f_j, entry.f_k, entry.q_j, entry.q_k, entry.r_j, entry.r_k)
+                           for entry in (self.FU.alu, self.FU.alub, self.FU.nextalu, self.FU.nextalub))
+        key = (self.pc, self.fetched, tuple(self.IFUnit), tuple(self.RF.R), self.RF.status_table(),
+               self.PreIssue.current_entries(), self.PreALU.current_entries(), self.PostALU.current_entries(),
+               self.PreALUB.current_entries(), self.PostALUB.current_entries(), self.PreMEM.current_entries(),
+               self.PostMEM.current_entries(), self.FU.alu_busy, self.FU.alub_busy, fu_entries)
+        head = self.PreALUB.current_entries()[:1]
+        return key, head[0].exec_cycle if head else None
+
     def snapshotall(self):
         print("for debug only")
         write_buf = '--------------------\nCycle:{}\n\n{}{}{}{}{}{}{}{}\n{}\n{}'.format(
@@ -180,6 +253,7 @@ class Pipeline:
             # decode instruction and put it into Pre-Issue buffer
             if pinst.get_type() in (_InstTypes.ALU, _InstTypes.SL, _InstTypes.ALUB) or isinstance(next_inst_to_fetch, InstructionNoOperation):
                 self.PreIssue.add_entry(pinst)
+                self.fetched += 1
                 FetchNum += 1
             elif pinst.get_type() == _InstTypes.BRCH:
                 inst = next_inst_to_fetch
@@ -188,39 +262,41 @@ class Pipeline:
                     self.next_pc = inst.dest
                     Ready = True
                 # check whether the register are ready
-                # get the list of desc in the pre issue 
-                regs = self.PreIssue.getreg()
+                # mask of the registers not ready or written by an instruction in the pre issue
+                regs = self.RF.status_mask()
+                for dest in self.PreIssue.getreg():
+                    regs |= 1 << dest
                 
                 if isinstance(inst, InstructionJumpRegister):
-                    if self.RF.is_ready(inst.op1_val) and inst.op1_val not in regs:
+                    if not regs >> inst.op1_val & 1:
                         self.next_pc = self.RF.reg_read(inst.op1_val)
                         Ready = True
                 elif isinstance(inst, InstructionBranchOnEqual):
-                    if self.RF.is_ready(inst.op1_val) and self.RF.is_ready(inst.op2_val) and inst.op1_val not in regs and inst.op2_val not in regs:
+                    if not regs & (1 << inst.op1_val | 1 << inst.op2_val):
                         if self.RF.reg_read(inst.op1_val) == self.RF.reg_read(inst.op2_val):
                             self.next_pc = self.pc + inst.dest + 4
                         Ready = True
                 elif isinstance(inst, InstructionBranchOnGreaterThanZero):
-                    if self.RF.is_ready(inst.op1_val) and inst.op1_val not in regs:
+                    if not regs >> inst.op1_val & 1:
                         if self.RF.reg_read(inst.op1_val) > 0:
-                            self.next_pc = self.pc + \
-                                signed_str_to_int(inst.offset + "00") + 4
+                            self.next_pc = self.pc + (sign_extend(inst.imm) << 2) + 4
                         Ready = True
                 elif isinstance(inst, InstructionBranchOnLessThanZero):
-                    if self.RF.is_ready(inst.op1_val) and inst.op1_val not in regs:
+                    if not regs >> inst.op1_val & 1:
                         if self.RF.reg_read(inst.op1_val) < 0:
-                            self.next_pc = self.pc + \
-                                signed_str_to_int(inst.offset + "00") + 4
+                            self.next_pc = self.pc + (sign_extend(inst.imm) << 2) + 4
                         Ready = True
                 # means it has been executed
                 if Ready:
                     self.IFUnit[0] = str('\t'.join(str(inst.desc_str).split(' ', 1)))
                     self.pc = self.next_pc
+                    self.fetched += 1
                 else:
                     self.IFUnit[1] = str('\t'.join(str(inst.desc_str).split(' ', 1)))
                 break
             elif isinstance(next_inst_to_fetch, InstructionBreakpoint):
                 self.IFUnit[0] = str('\t'.join(str(pinst.inst.desc_str).split(' ', 1)))
+                self.fetched += 1
                 self.is_over = True
                 break
             self.pc = self.next_pc
@@ -287,11 +363,7 @@ class Pipeline:
                     elif not isinstance(pinst.inst, InstructionLoadWord):
                         LWSeq = False
 
-        while True:
-            pinst = self.PreIssue.next_entry()
-            if pinst is None:
-                break
-            self.PreIssue.add_entry(pinst)
+        self.PreIssue.keep_rest()
 
     def alu(self):
         """
@@ -339,17 +411,15 @@ class Pipeline:
             # since the size of the prealu is two, there is at most one pinst left
             pinst = self.PreALU.next_entry()
             if pinst is not None:
-                # update the FU
-                self.FU.alu = copy.deepcopy(self.FU.nextalu)
                 self.PreALU.add_entry(pinst)
+            # the next instruction was recorded in nextalu while the FU was busy, also when it was issued in this cycle
+            if self.FU.nextalu.pip_inst.inst is not None:
+                # update the FU
+                self.FU.alu, self.FU.nextalu = self.FU.nextalu, _FUEntry(_PipelineInstEntry(None))
             else:
                 self.FU.alu_busy = False
         else:
-           while True:
-            pinst = self.PreALU.next_entry()
-            if pinst is None:
-                break
-            self.PreALU.add_entry(pinst) 
+            self.PreALU.keep_rest()
 
     def alub(self):
         """
@@ -364,7 +434,7 @@ class Pipeline:
 
         if self.FU.alub is not None and self.FU.alub.is_ready_for_exec() and pinst is not None:
             pinst.exec_cycle += 1
-            if pinst.exec_cycle >= 2:
+            if pinst.exec_cycle >= self.alub_latency:
                 # calc the pinst.result
                 inst = pinst.inst
                 rg1 = self.RF.reg_read(self.FU.alub.f_j)
@@ -372,37 +442,32 @@ class Pipeline:
                 self.PreALUB.pop_entry()
                 # For SLL, SRL, SRA: rg1 is the value to be shifted, rg2 is the shift amount
                 if isinstance(inst, InstructionShiftWordLeftLogical):
-                    pinst.result = signed_str_to_int(
-                        int_to_16bitstr(rg1)[val:] + "0"*val)
+                    pinst.result = sll(rg1, val)
                 elif isinstance(inst, InstructionShiftWordRightLogical):
-                    pinst.result = signed_str_to_int(
-                        "0"*val + int_to_16bitstr(rg1)[:-val])
+                    pinst.result = srl(rg1, val)
                 elif isinstance(inst, InstructionShiftWordRightArithmetic):
-                    pinst.result = signed_str_to_int(int_to_16bitstr(
-                        rg1)[0]*val + int_to_16bitstr(rg1)[:-val])
+                    pinst.result = sra(rg1, val)
                 elif isinstance(inst, InstructionMulWord):
                     rg2 = self.RF.reg_read(self.FU.alu.f_k)
-                    pinst.result = signed_str_to_int(
-                        str((rg1 * rg2) & 0xFFFFFFFF))
+                    pinst.result = mul32(rg1, rg2)
                 elif isinstance(inst, InstructionMulWord2):
-                    pinst.result = signed_str_to_int(
-                        str((rg1 * val) & 0xFFFFFFFF))
+                    pinst.result = mul32(rg1, val)
                 self.PostALUB.add_entry(pinst)
                 pinst.exec_cycle = -1
-                
-                pinst = self.PreALU.next_entry()
+
+                # the next instruction of the Pre-ALUB queue takes the FU
+                pinst = self.PreALUB.next_entry()
                 if pinst is not None:
-                    # update the FU
-                    self.FU.alub = copy.deepcopy(self.FU.nextalub)
                     self.PreALUB.add_entry(pinst)
+                # the next instruction was recorded in nextalub while the FU was busy, also when it was issued in this
+                # cycle
+                if self.FU.nextalub.pip_inst.inst is not None:
+                    # update the FU
+                    self.FU.alub, self.FU.nextalub = self.FU.nextalub, _FUEntry(_PipelineInstEntry(None))
                 else:
                     self.FU.alub_busy = False
-        else:
-            while True:
-                pinst = self.PreALUB.next_entry()
-                if pinst is None:
-                    break
-                self.PreALUB.add_entry(pinst)
+        # the instructions behind the processed one wait in the queue, also while it takes more than one cycle
+        self.PreALUB.keep_rest()
 
     def mem(self):
         """
@@ -467,11 +532,7 @@ class Pipeline:
 
             pinst.result = None
             
-            while True:
-                pinst = self.PostALU.next_entry()
-                if pinst is None:
-                    break
-                self.PostALU.add_entry(pinst)
+            self.PostALU.keep_rest()
         # based on the PostALUB buffer
         if not self.PostALUB.isempty():
             # if (self.FU.alu.r_j == False or self.FU.alub.f_i != self.FU.alu.f_j) and (self.FU.alu.r_k == False or self.FU.alub.f_i != self.FU.alu.f_k):
@@ -493,11 +554,7 @@ class Pipeline:
             self.nextRF.flush_register_status(pinst.dest)
             pinst.result = None
             
-            while True:
-                pinst = self.PostALUB.next_entry()
-                if pinst is None:
-                    break
-                self.PostALUB.add_entry(pinst)
+            self.PostALUB.keep_rest()
                 
         # based on the PostMEM buffer
         if not self.PostMEM.isempty():
@@ -509,11 +566,7 @@ class Pipeline:
 
             pinst.result = None
             
-            while True:
-                pinst = self.PostMEM.next_entry()
-                if pinst is None:
-                    break
-                self.PostMEM.add_entry(pinst)
+            self.PostMEM.keep_rest()
 
 
 class _FUEntry:
@@ -543,37 +596,51 @@ class DualStatus:
     """
     maintain the dual status 
     of queue & buffer
+    the entries of the previous cycle and of the next cycle are kept in fixed size slot lists with their counts,
+    the end of the cycle swaps the lists instead of building new ones
     """
 
     def __init__(self, name: str, size: int):
-        self.comingentries = []
-        self.appendentries = []
-        self.entries = []
         self._size = size
         self._name = name
+        # entries at the end of the previous cycle
+        self._cur = [None] * size
+        self._cur_len = 0
+        # entries of the next cycle
+        self._next = [None] * size
+        self._next_len = 0
+        # entries of the next cycle when the unit started to process the previous ones, see set_idx
+        self._staged = [None] * size
+        self._staged_len = 0
         self.idx = 0
 
     def update(self):
         self.idx = 0
-        sz = len(self.entries)
         if self._size == 1:  # do not check the post alu, post alub, post mem
-            self.entries = self.appendentries[:]
+            self._cur, self._staged = self._staged, self._cur
+            self._cur_len = self._staged_len
         else:
-            self.entries = self.comingentries[:]
-            self.entries.extend(x for x in self.appendentries[sz:])
-        self.comingentries.clear()
-        self.appendentries.clear()
+            # the kept entries followed by the entries added behind the previous ones
+            length = self._next_len
+            for idx in range(self._cur_len, self._staged_len):
+                self._next[length] = self._staged[idx]
+                length += 1
+            self._cur, self._next = self._next, self._cur
+            self._cur_len = length
+        self._next_len = 0
+        self._staged_len = 0
 
     def add_entry(self, entry: _PipelineInstEntry):
-        if len(self.comingentries) < self._size:
-            self.comingentries.append(entry)
+        if self._next_len < self._size:
+            self._next[self._next_len] = entry
+            self._next_len += 1
             return True
         else:
             return False
 
     def pop_entry(self, idx=0):
-        if len(self.comingentries):
-            del self.comingentries[-1]
+        if self._next_len:
+            self._next_len -= 1
             return True
         else:
             return False
@@ -583,49 +650,65 @@ class DualStatus:
 
     def set_idx(self, idx=0):
         self.idx = idx
-        self.appendentries = self.comingentries[:]
-        self.comingentries.clear()
+        self._staged, self._next = self._next, self._staged
+        self._staged_len = self._next_len
+        self._next_len = 0
 
     def copy(self):
-        self.comingentries = self.entries[:]
+        self._next[:self._cur_len] = self._cur[:self._cur_len]
+        self._next_len = self._cur_len
 
     def size(self):
-        return len(self.entries)
+        return self._cur_len
 
     def isempty(self):
-        return len(self.entries) == 0
+        return self._cur_len == 0
 
     def isfull(self):
-        return len(self.entries) == self._size
+        return self._cur_len == self._size
 
     def next_entry(self):
-        if self.idx < len(self.entries):
+        if self.idx < self._cur_len:
+            self.idx += 1
+            return self._cur[self.idx - 1]
+
+    def current_entries(self):
+        """
+        :return: tuple of the entries at the end of the previous cycle
+        """
+        return tuple(self._cur[:self._cur_len])
+
+    def keep_rest(self):
+        """
+        keep the entries not visited by next_entry for the next cycle
+        """
+        while self.idx < self._cur_len:
+            self.add_entry(self._cur[self.idx])
             self.idx += 1
-            return self.entries[self.idx - 1]
 
     def sync_size(self):
-        return len(self.comingentries)
+        return self._next_len
 
     def sync_isempty(self):
-        return len(self.comingentries) == 0
+        return self._next_len == 0
 
     def sync_isfull(self):
-        return len(self.comingentries) == self._size
+        return self._next_len == self._size
     
     def snapshot(self):
         desc_str = self._name + " Buffer:"
-        if self._size == 1 and len(self.comingentries):
+        if self._size == 1 and self._next_len:
             desc_str += "[" + \
                 '\t'.join(
-                    str(self.comingentries[0].inst.desc_str).split(' ', 1)) + "]\n"
+                    str(self._next[0].inst.desc_str).split(' ', 1)) + "]\n"
         else:
             desc_str += "\n"
         if self._size >= 2:
             for idx in range(self._size):
                 desc_str += "\tEntry " + str(idx) + ":"
-                if idx < len(self.comingentries):
+                if idx < self._next_len:
                     desc_str += "[" + '\t'.join(
-                        str(self.comingentries[idx].inst.desc_str).split(' ', 1)) + "]\n"
+                        str(self._next[idx].inst.desc_str).split(' ', 1)) + "]\n"
                 else:
                     desc_str += "\n"
         return desc_str
@@ -642,9 +725,9 @@ class Queue(DualStatus):
         desc_str = self._name + " Queue:\n"
         for idx in range(self._size):
             desc_str += "\tEntry " + str(idx) + ":"
-            if idx < len(self.entries):
+            if idx < self._cur_len:
                 desc_str += "[" + '\t'.join(
-                    str(self.entries[idx].inst.desc_str).split(' ', 1)) + "]\n"
+                    str(self._cur[idx].inst.desc_str).split(' ', 1)) + "]\n"
             else:
                 desc_str += "\n"
         return desc_str
@@ -658,27 +741,24 @@ class Buffer(DualStatus):
 
     def __str__(self):
         desc_str = self._name + " Buffer:"
-        if self._size == 1 and len(self.entries):
+        if self._size == 1 and self._cur_len:
             desc_str += "[" + \
                 '\t'.join(
-                    str(self.entries[0].inst.desc_str).split(' ', 1)) + "]\n"
+                    str(self._cur[0].inst.desc_str).split(' ', 1)) + "]\n"
         else:
             desc_str += "\n"
         if self._size >= 2:
             for idx in range(self._size):
                 desc_str += "\tEntry " + str(idx) + ":"
-                if idx < len(self.entries):
+                if idx < self._cur_len:
                     desc_str += "[" + '\t'.join(
-                        str(self.entries[idx].inst.desc_str).split(' ', 1)) + "]\n"
+                        str(self._cur[idx].inst.desc_str).split(' ', 1)) + "]\n"
                 else:
                     desc_str += "\n"
         return desc_str
 
     def getreg(self):
-        res = []
-        for idx in range(len(self.entries)):
-            res.append(self.entries[idx].dest)
-        return res
+        return [self._cur[idx].dest for idx in range(self._cur_len)]
 
 class RegisterFile:
     """
@@ -690,9 +770,11 @@ class RegisterFile:
         self.size = 32
         self.print_width = 8
         self.R = [0] * self.size
-        self._table_RegisterStatus = []
-        for idx in range(self.size):
-            self._table_RegisterStatus.append(_RegisterAllocationUnit())
+        # register result status table, one bit per register for each functional unit: alu, alub or mem.
+        # a copy of the RegisterFile copies the three ints and shares the registers
+        self._in_alu = 0
+        self._in_alub = 0
+        self._in_mem = 0
 
     def __str__(self):
         desc_str = 'Registers'
@@ -716,26 +798,41 @@ class RegisterFile:
 
     def record_register_status(self, reg_addr: int, fu: str):
         if fu == "ALU":
-            self._table_RegisterStatus[reg_addr].inalu = True
+            self._in_alu |= 1 << reg_addr
         if fu == "ALUB":
-            self._table_RegisterStatus[reg_addr].inalub = True
+            self._in_alub |= 1 << reg_addr
         if fu == "MEM":
-            self._table_RegisterStatus[reg_addr].inmem = True
+            self._in_mem |= 1 << reg_addr
+
+    def status_table(self):
+        """
+        :return: the in ALU, in ALUB and in MEM masks of the register result status table
+        """
+        return self._in_alu, self._in_alub, self._in_mem
+
+    def status_mask(self) -> int:
+        """
+        :return: mask of the registers waiting for a result
+        """
+        return self._in_alu | self._in_alub | self._in_mem
 
     def is_ready(self, reg_addr: int) -> bool:
-        return self._table_RegisterStatus[reg_addr].inalu == False and self._table_RegisterStatus[reg_addr].inalub == False and self._table_RegisterStatus[reg_addr].inmem == False
+        return not (self._in_alu | self._in_alub | self._in_mem) >> reg_addr & 1
 
     def inalu(self, reg_addr) -> bool:
-        return self._table_RegisterStatus[reg_addr].inalu
+        return bool(self._in_alu >> reg_addr & 1)
 
     def inalub(self, reg_addr) -> bool:
-        return self._table_RegisterStatus[reg_addr].inalub
+        return bool(self._in_alub >> reg_addr & 1)
     
     def inmem(self, reg_addr) -> bool:
-        return self._table_RegisterStatus[reg_addr].inmem
+        return bool(self._in_mem >> reg_addr & 1)
 
     def flush_register_status(self, reg_addr: int):
-        self._table_RegisterStatus[reg_addr].reset()
+        mask = ~(1 << reg_addr)
+        self._in_alu &= mask
+        self._in_alub &= mask
+        self._in_mem &= mask
 
     def reg_write(self, reg_addr: int, value: int):
         if reg_addr < 32 and reg_addr >= 0:
@@ -750,36 +847,43 @@ class RegisterFile:
             raise Exception('Register address out of range!')
 
 
-class DataSegment:
+class _WriteJournal:
     """
-    Data Segment of the memory. Starts from the end of the BREAK of the program and until the end of the file.
+    Pending writes of a cycle, in program order. The stages read the state of the previous cycle and log their
+    writes here, the journal is applied to the state at the end of the cycle instead of copying the whole state.
     """
 
-    def __init__(self, data_mem):
-        self._table = data_mem
-        self.print_width = 8
-        # self._mem_lock = {}
-        # for addr in data_mem:
-        #     self._mem_lock[addr] = False
+    def __init__(self):
+        self._writes = []
 
-    def __str__(self):
-        desc_str = 'Data'
-        cnt = 0
-        for key, value in self._table.items():
-            if cnt % self.print_width == 0:
-                desc_str += '\n{}:'.format(key)
-            desc_str += '\t{}'.format(value.int_val)
-            cnt += 1
-        return desc_str + '\n'
+    def commit(self, target):
+        for write, args in self._writes:
+            write(target, *args)
+        self._writes.clear()
 
-    def mem_write(self, mem_addr: int, value: int):
-        self._table[mem_addr].int_val = value
 
-    def mem_read(self, mem_addr: int) -> int:
-        return self._table[mem_addr].int_val
+class _RegisterJournal(_WriteJournal):
+    """
+    register and register status writes to a RegisterFile
+    """
+
+    def record_register_status(self, reg_addr: int, fu: str):
+        self._writes.append((RegisterFile.record_register_status, (reg_addr, fu)))
 
-    # def mem_lock(self, mem_addr):
-    #     return self._mem_lock[mem_addr]
+    def flush_register_status(self, reg_addr: int):
+        self._writes.append((RegisterFile.flush_register_status, (reg_addr, )))
+
+    def reg_write(self, reg_addr: int, value: int):
+        self._writes.append((RegisterFile.reg_write, (reg_addr, value)))
+
+
+class _MemoryJournal(_WriteJournal):
+    """
+    memory writes to a DataSegment
+    """
+
+    def mem_write(self, mem_addr, value):
+        self._writes.append((DataSegment.mem_write, (mem_addr, value)))
 
 
 class FunctionalUnitStatus:
@@ -797,12 +901,14 @@ class FunctionalUnitStatus:
         self.alu_busy = False
         self.alub_busy = False
         self.ref_RF = RF
-        self.tmp_ref_RF = copy.deepcopy(self.ref_RF)
+        self.tmp_ref_RF = copy.copy(self.ref_RF)
 
     
     def issue_init(self, RF: RegisterFile):
-        self.ref_RF = copy.deepcopy(RF)
-        self.tmp_ref_RF = copy.deepcopy(RF)
+        # RF is only written when the journal is committed at the end of the cycle
+        self.ref_RF = RF
+        # only the status table of tmp_ref_RF is written, a shallow copy copies the three masks
+        self.tmp_ref_RF = copy.copy(RF)
 
     def add_entry(self, pinst: _PipelineInstEntry):
         success = False
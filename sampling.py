@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import math
+from statistics import NormalDist, mean, stdev
+from simplesim import SimpleSim
+from pipeline import Pipeline
+
+
+class SamplingReport:
+    """
+    Estimate of the cycles of the whole program from the measured windows of a sampled simulation.
+    The CPI of the windows is averaged, its confidence interval uses the normal approximation of the mean and needs
+    at least two windows. The interval only covers the sampling error, not the bias of windows started with empty
+    buffers.
+    """
+
+    def __init__(self, instructions, samples, confidence, detailed_instructions, detailed_cycles):
+        """
+        :param instructions: number of instructions of the whole functional run
+        :param samples: list of (measured instructions, measured cycles) of the windows
+        :param confidence: confidence level of the intervals, e.g. 0.95
+        :param detailed_instructions: number of instructions simulated by the pipeline, warm-up included
+        :param detailed_cycles: number of cycles simulated by the pipeline, warm-up included
+        """
+        self.instructions = instructions
+        self.samples = samples
+        self.confidence = confidence
+        self.detailed_instructions = detailed_instructions
+        self.detailed_cycles = detailed_cycles
+        cpis = [cycles / instrs for instrs, cycles in samples]
+        self.cpi = mean(cpis) if cpis else float('nan')
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        # half width of the confidence interval of the CPI, unknown with less than two windows
+        self.cpi_error = z * stdev(cpis) / math.sqrt(len(cpis)) if len(cpis) > 1 else float('nan')
+
+    @property
+    def cycles(self):
+        return self.instructions * self.cpi
+
+    @property
+    def cycles_interval(self):
+        return self.instructions * (self.cpi - self.cpi_error), self.instructions * (self.cpi + self.cpi_error)
+
+    @property
+    def ipc(self):
+        return 1 / self.cpi
+
+    @property
+    def ipc_interval(self):
+        low_cpi, high_cpi = self.cpi - self.cpi_error, self.cpi + self.cpi_error
+        return 1 / high_cpi, 1 / low_cpi if low_cpi > 0 else float('inf')
+
+    @property
+    def relative_error(self):
+        return self.cpi_error / self.cpi
+
+    def __str__(self):
+        cycles_low, cycles_high = self.cycles_interval
+        ipc_low, ipc_high = self.ipc_interval
+        desc_str = 'Sampled simulation\n'
+        desc_str += 'Instructions:\t{}\n'.format(self.instructions)
+        desc_str += 'Samples:\t{}\n'.format(len(self.samples))
+        desc_str += 'Detailed:\t{} instructions, {} cycles\n'.format(self.detailed_instructions, self.detailed_cycles)
+        if math.isnan(self.cpi_error):
+            desc_str += 'CPI:\t{:.4f} (no confidence interval with less than two samples)\n'.format(self.cpi)
+            desc_str += 'Cycles:\t{:.0f}\n'.format(self.cycles)
+            desc_str += 'IPC:\t{:.4f}\n'.format(self.ipc)
+        else:
+            desc_str += 'CPI:\t{:.4f} +- {:.4f} ({:.0%} confidence, {:.2%})\n'.format(
+                self.cpi, self.cpi_error, self.confidence, self.relative_error)
+            desc_str += 'Cycles:\t{:.0f} [{:.0f}, {:.0f}]\n'.format(self.cycles, cycles_low, cycles_high)
+            desc_str += 'IPC:\t{:.4f} [{:.4f}, {:.4f}]\n'.format(self.ipc, ipc_low, ipc_high)
+        return desc_str
+
+
+def measure_window(instr_mem, sim, warmup, window, max_stall_cycles=1000):
+    """
+    detailed window from the current state of a SimpleSim, the SimpleSim is left unchanged
+    :param instr_mem: instruction memory
+    :param sim: SimpleSim at the start of the window
+    :param warmup: number of instructions of the window before the measure
+    :param window: number of measured instructions
+    :param max_stall_cycles: the window fails when its pipeline fetches nothing for this many cycles
+    :return: (measured instructions, measured cycles) or None when the program ends during the warm-up, then the
+             instructions and the cycles simulated by the pipeline
+    """
+    pipe = Pipeline.from_state(instr_mem, sim.PC, sim.RF.R, sim.DS)
+    start = (0, 0) if warmup == 0 else None
+    progress = (0, 0)
+    while not pipe.is_over and pipe.fetched < warmup + window:
+        pipe.next_cycle()
+        if start is None and pipe.fetched >= warmup:
+            start = (pipe.fetched, pipe.cycle)
+        if pipe.fetched != progress[0]:
+            progress = (pipe.fetched, pipe.cycle)
+        elif pipe.cycle - progress[1] > max_stall_cycles:
+            raise RuntimeError('pipeline window starting at instruction {} stalled at PC {}'.format(
+                sim.cycle, pipe.pc))
+        pipe.fast_forward(progress[1] + max_stall_cycles + 1)
+    measured = None
+    if start is not None and pipe.fetched > start[0]:
+        measured = (pipe.fetched - start[0], pipe.cycle - start[1])
+    return measured, pipe.fetched, pipe.cycle
+
+
+def sampled_simulation(instr_mem, data_mem, interval=10000, warmup=200, window=1000, confidence=0.95, mode='block',
+                       max_stall_cycles=1000):
+    """
+    SMARTS style sampled simulation. SimpleSim runs the whole program functionally, at the start of every interval
+    a Pipeline is started from the functional state with empty buffers. The pipeline runs warmup instructions to
+    fill its buffers and then measures the cycles of the next window instructions. The functional run goes on
+    from where it was, the pipeline works on a copy-on-write copy of the memory.
+    :param instr_mem: instruction memory
+    :param data_mem: data memory
+    :param interval: number of instructions between the starts of two windows
+    :param warmup: number of instructions of a window before the measure
+    :param window: number of measured instructions of a window
+    :param confidence: confidence level of the reported intervals
+    :param mode: execution mode of SimpleSim
+    :param max_stall_cycles: a window fails when its pipeline fetches nothing for this many cycles
+    :return: SamplingReport
+    """
+    if warmup + window > interval:
+        raise RuntimeError('the warm-up and the measured window must fit in the sampling interval')
+    sim = SimpleSim(instr_mem, data_mem, mode=mode)
+    samples = []
+    detailed_instructions = 0
+    detailed_cycles = 0
+    while not sim.is_over:
+        measured, fetched, cycles = measure_window(instr_mem, sim, warmup, window, max_stall_cycles)
+        detailed_instructions += fetched
+        detailed_cycles += cycles
+        if measured is not None:
+            samples.append(measured)
+        sim.run(max_instructions=interval)
+    return SamplingReport(sim.cycle, samples, confidence, detailed_instructions, detailed_cycles)
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
-from mips32 import Instruction, InstructionJump, InstructionJumpRegister, InstructionBranchOnEqual, InstructionBranchOnGreaterThanZero, InstructionBranchOnLessThanZero, InstructionStoreWord, InstructionLoadWord, InstructionShiftWordLeftLogical, InstructionShiftWordRightLogical, InstructionShiftWordRightArithmetic, InstructionAnd, InstructionNotOr, InstructionMulWord, InstructionSubtractWord, InstructionAddWord, InstructionSetOnLessThan, InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2, InstructionSetOnLessThan2, signed_str_to_int
-from utils import int_to_16bitstr
+from mips32 import InstructionJump, InstructionJumpRegister, InstructionBranchOnEqual, InstructionBranchOnGreaterThanZero, InstructionBranchOnLessThanZero, InstructionStoreWord, InstructionLoadWord, InstructionShiftWordLeftLogical, InstructionShiftWordRightLogical, InstructionShiftWordRightArithmetic, InstructionAnd, InstructionNotOr, InstructionMulWord, InstructionSubtractWord, InstructionAddWord, InstructionSetOnLessThan, InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2, InstructionSetOnLessThan2, InstructionNoOperation, InstructionBreakpoint, sign_extend
+from bitops import sll, srl, sra, mul32
+from memory import DataSegment
+from translator import BlockTranslator
+from checkpoint import save_checkpoint
 
 class SimpleSim:
     '''
@@ -13,78 +16,455 @@ class SimpleSim:
     MUL
     SUB, ADD
     SLT
+    mode 'interp' executes the decoded instructions, mode 'threaded' turns each instruction into a closure once at
+    load time and only calls the closure of the PC at each step. mode 'block' translates each basic block into a
+    compiled python function, next_instr then executes a whole block and cycle advances by the size of the block.
     '''
 
-    def __init__(self, instr_mem, data_mem):
+    def __init__(self, instr_mem, data_mem, mode='interp'):
         self.RF = RegisterFile()
         self.DS = DataSegment(data_mem)
         self.instr_mem = instr_mem
         self.PC = 64
         self.cycle = 0
         self.is_over = False
+        self.mode = mode
+        if mode == 'threaded':
+            self.code = {pc: _thread_instr(inst) for pc, inst in instr_mem.items()}
+        elif mode == 'block':
+            self.translator = BlockTranslator(instr_mem)
+        elif mode != 'interp':
+            raise RuntimeError('unknown simulation mode ' + str(mode))
 
     def next_instr(self):
+        if self.mode == 'block':
+            next_pc, cnt = self.translator.lookup(self.PC)(self.RF.R, self.DS)
+            self.cycle += cnt
+            if next_pc is None:
+                # blocks are straight line code, PC stays on the BREAK like in the other modes
+                self.PC += 4 * (cnt - 1)
+                self.is_over = True
+            else:
+                self.PC = next_pc
+            return
+        if self.mode == 'threaded':
+            self.cycle += 1
+            next_pc = self.code[self.PC](self.RF.R, self.DS)
+            if next_pc is None:
+                self.is_over = True
+            else:
+                self.PC = next_pc
+            return
+        self._step()
+
+    def _step(self):
+        # execute exactly one instruction, valid in every mode since they all share RF, DS and PC
         self.cycle += 1
-        # print(self.cycle)
         cur_str = self.instr_mem[self.PC]
-        if cur_str.is_break():
-            self.is_over = True
-            return
+        SimpleSim._execute_table[cur_str.__class__](self, cur_str)
 
-        # branch instructions
-        if isinstance(cur_str, InstructionJump):
-            self.PC = cur_str.dest
-        elif isinstance(cur_str, InstructionJumpRegister):
-            self.PC = self.RF.reg_read(int(cur_str.register_s, 2))
+    def run(self, max_instructions=None, until_pc=frozenset(), trace=None):
+        """
+        run the program in a loop internal to the simulator, until BREAK, the instruction limit or a breakpoint.
+        Without trace and until_pc the loop of the mode runs with nothing else per instruction. With them the run
+        goes one instruction at a time, so the stop and the trace are exact in every mode.
+        :param max_instructions: maximum number of instructions to execute, None for no limit
+        :param until_pc: set of PCs, the run stops when the PC reaches one of them. The instruction at the PC of
+                         the start of the run is always executed, thus a run can resume from a breakpoint.
+        :param trace: None, or callable trace(sim, pc) called after each instruction with the PC it executed
+        :return: RunSummary
+        """
+        limit = -1 if max_instructions is None else max_instructions
+        start_cycle = self.cycle
+        if self.is_over:
+            reason = RunSummary.BREAK
+        elif trace is not None or until_pc:
+            reason = self._run_stepped(limit, until_pc, trace)
+        elif self.mode == 'threaded':
+            reason = self._run_threaded(limit)
+        elif self.mode == 'block':
+            reason = self._run_blocks(limit)
         else:
-            self.PC += 4
-            rg1 = self.RF.reg_read(int(cur_str.instr_str[6:11], 2))
-            rg2 = self.RF.reg_read(int(cur_str.instr_str[11:16], 2))
-
-        if isinstance(cur_str, InstructionBranchOnEqual):
-            if self.RF.reg_read(cur_str.op1_val) == self.RF.reg_read(cur_str.op2_val):
-                self.PC += cur_str.dest
-        elif isinstance(cur_str, InstructionBranchOnGreaterThanZero):
-            if self.RF.reg_read(int(cur_str.register_s, 2)) > 0:
-                self.PC += signed_str_to_int(cur_str.offset + "00")
-        elif isinstance(cur_str, InstructionBranchOnLessThanZero):
-            if self.RF.reg_read(int(cur_str.register_s, 2)) < 0:
-                self.PC += signed_str_to_int(cur_str.offset + "00")
-        elif isinstance(cur_str, InstructionStoreWord):
-            self.DS.mem_write(rg1 + cur_str.op1_val, rg2)
-        elif isinstance(cur_str, InstructionLoadWord):
-            self.RF.reg_write(
-                cur_str.dest, self.DS.mem_read(cur_str.op1_val + rg1))
-        elif isinstance(cur_str, InstructionShiftWordLeftLogical):
-            self.RF.reg_write(cur_str.dest, signed_str_to_int(int_to_16bitstr(rg2)[cur_str.sa_val:] + "0"*cur_str.sa_val))
-        elif isinstance(cur_str, InstructionShiftWordRightLogical):
-            self.RF.reg_write(cur_str.dest, signed_str_to_int("0"*cur_str.sa_val + int_to_16bitstr(rg2)[:-cur_str.sa_val]))
-        elif isinstance(cur_str, InstructionShiftWordRightArithmetic):
-            self.RF.reg_write(cur_str.dest, signed_str_to_int(int_to_16bitstr(rg2)[0]*cur_str.sa_val + int_to_16bitstr(rg2)[:-cur_str.sa_val]))
-        elif isinstance(cur_str, InstructionAnd):
-            self.RF.reg_write(cur_str.dest, rg1 & rg2)
-        elif isinstance(cur_str, InstructionNotOr):
-            self.RF.reg_write(cur_str.dest, ~(rg1 | rg2))
-        elif isinstance(cur_str, InstructionMulWord):  # not checked
-            # self.RF.reg_write(cur_str.dest, signed_str_to_int(
-            #             str((rg1 * rg2) & 0xFFFFFFFF)))
-            self.RF.reg_write(cur_str.dest, rg1 * rg2)
-        elif isinstance(cur_str, InstructionSubtractWord):
-            self.RF.reg_write(cur_str.dest, rg1 - rg2)
-        elif isinstance(cur_str, InstructionAddWord):
-            self.RF.reg_write(cur_str.dest, rg1 + rg2)
-        elif isinstance(cur_str, InstructionSetOnLessThan):
-            self.RF.reg_write(cur_str.dest, int(rg1 < rg2))
-        elif isinstance(cur_str, InstructionAddWord2):
-            self.RF.reg_write(cur_str.dest, rg1 + cur_str.imm_val)
-        elif isinstance(cur_str, InstructionSubWord2):
-            self.RF.reg_write(cur_str.dest, rg1 - cur_str.imm_val)
-        elif isinstance(cur_str, InstructionMulWord2):
-            self.RF.reg_write(cur_str.dest, rg1 * cur_str.imm_val)
-        elif isinstance(cur_str, InstructionAnd2):
-            self.RF.reg_write(cur_str.dest, rg1 & cur_str.imm_val)
-        elif isinstance(cur_str, InstructionSetOnLessThan2):
-            self.RF.reg_write(cur_str.dest, int(rg1 < cur_str.imm_val))
+            reason = self._run_interp(limit)
+        return RunSummary(self.cycle - start_cycle, reason, self.PC, self.cycle, list(self.RF.R))
+
+    def collect_bbv(self, interval):
+        """
+        run the program until BREAK and collect its basic block vectors: for each interval, the number of
+        instructions executed in each basic block keyed by the entry PC of the block. The program runs by basic
+        blocks whatever the mode, thus an interval ends at the first block boundary after interval instructions.
+        :param interval: number of instructions of an interval
+        :return: list of the instruction counts at the start of each interval, list of the vectors as dicts
+        """
+        translator = self.translator if self.mode == 'block' else BlockTranslator(self.instr_mem)
+        R, DS = self.RF.R, self.DS
+        starts, vectors = [], []
+        vector = None
+        n = interval
+        pc = self.PC
+        while not self.is_over:
+            if n >= interval:
+                starts.append(self.cycle)
+                vector = {}
+                vectors.append(vector)
+                n = 0
+            next_pc, cnt = translator.lookup(pc)(R, DS)
+            vector[pc] = vector.get(pc, 0) + cnt
+            n += cnt
+            self.cycle += cnt
+            if next_pc is None:
+                self.PC = pc + 4 * (cnt - 1)
+                self.is_over = True
+            else:
+                pc = self.PC = next_pc
+        return starts, vectors
+
+    def save_checkpoint(self, path):
+        """
+        write PC, registers and the touched data pages, Pipeline.from_checkpoint continues from there
+        :param path: path of the checkpoint file
+        """
+        save_checkpoint(path, self.PC, self.cycle, self.RF.R, self.DS)
+
+    def _run_stepped(self, limit, until_pc, trace):
+        step = self.next_instr if self.mode == 'threaded' else self._step
+        n = 0
+        while n != limit:
+            if n and self.PC in until_pc:
+                return RunSummary.UNTIL_PC
+            pc = self.PC
+            step()
+            n += 1
+            if trace is not None:
+                trace(self, pc)
+            if self.is_over:
+                return RunSummary.BREAK
+        return RunSummary.MAX_INSTRUCTIONS
+
+    def _run_interp(self, limit):
+        instr_mem = self.instr_mem
+        table = SimpleSim._execute_table
+        n = 0
+        while n != limit:
+            inst = instr_mem[self.PC]
+            table[inst.__class__](self, inst)
+            n += 1
+            if self.is_over:
+                self.cycle += n
+                return RunSummary.BREAK
+        self.cycle += n
+        return RunSummary.MAX_INSTRUCTIONS
+
+    def _run_threaded(self, limit):
+        code = self.code
+        R, DS = self.RF.R, self.DS
+        pc = self.PC
+        n = 0
+        reason = RunSummary.MAX_INSTRUCTIONS
+        while n != limit:
+            next_pc = code[pc](R, DS)
+            n += 1
+            if next_pc is None:
+                self.is_over = True
+                reason = RunSummary.BREAK
+                break
+            pc = next_pc
+        self.PC = pc
+        self.cycle += n
+        return reason
+
+    def _run_blocks(self, limit):
+        lookup = self.translator.lookup
+        max_block_size = self.translator.max_block_size
+        R, DS = self.RF.R, self.DS
+        pc = self.PC
+        n = 0
+        # whole blocks while the limit is out of reach of any block, then single instructions to stop exactly
+        while limit < 0 or limit - n >= max_block_size:
+            next_pc, cnt = lookup(pc)(R, DS)
+            n += cnt
+            if next_pc is None:
+                self.PC = pc + 4 * (cnt - 1)
+                self.cycle += n
+                self.is_over = True
+                return RunSummary.BREAK
+            pc = next_pc
+        self.PC = pc
+        self.cycle += n
+        return self._run_interp(limit - n)
+
+    # execute handlers, one per instruction class. They work on the register indices decoded by mips32,
+    # thus the cost of an instruction does not depend on its position in a chain of checks.
+    def _exec_break(self, inst):
+        self.is_over = True
+
+    def _exec_nop(self, inst):
+        self.PC += 4
+
+    # branch instructions
+    def _exec_jump(self, inst):
+        self.PC = inst.dest
+
+    def _exec_jump_register(self, inst):
+        self.PC = self.RF.R[inst.rs]
+
+    def _exec_branch_on_equal(self, inst):
+        R = self.RF.R
+        self.PC += inst.dest + 4 if R[inst.rs] == R[inst.rt] else 4
+
+    def _exec_branch_on_greater_than_zero(self, inst):
+        self.PC += (sign_extend(inst.imm) << 2) + 4 if self.RF.R[inst.rs] > 0 else 4
+
+    def _exec_branch_on_less_than_zero(self, inst):
+        self.PC += (sign_extend(inst.imm) << 2) + 4 if self.RF.R[inst.rs] < 0 else 4
+
+    # memory instructions
+    def _exec_store_word(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        self.DS.mem_write(R[inst.rs] + inst.op1_val, R[inst.rt])
+
+    def _exec_load_word(self, inst):
+        self.PC += 4
+        self.RF.R[inst.rt] = self.DS.mem_read(inst.op1_val + self.RF.R[inst.rs])
+
+    # category 1 ALU instructions, rd <- rs op rt
+    def _exec_shift_word_left_logical(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = sll(R[inst.rt], inst.shamt)
+
+    def _exec_shift_word_right_logical(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = srl(R[inst.rt], inst.shamt)
+
+    def _exec_shift_word_right_arithmetic(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = sra(R[inst.rt], inst.shamt)
+
+    def _exec_and(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = R[inst.rs] & R[inst.rt]
+
+    def _exec_not_or(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = ~(R[inst.rs] | R[inst.rt])
+
+    def _exec_mul_word(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = mul32(R[inst.rs], R[inst.rt])
+
+    def _exec_subtract_word(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = R[inst.rs] - R[inst.rt]
+
+    def _exec_add_word(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = R[inst.rs] + R[inst.rt]
+
+    def _exec_set_on_less_than(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rd] = int(R[inst.rs] < R[inst.rt])
+
+    # category 2 ALU instructions, rt <- rs op immediate
+    def _exec_add_word2(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rt] = R[inst.rs] + inst.imm_val
+
+    def _exec_sub_word2(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rt] = R[inst.rs] - inst.imm_val
+
+    def _exec_mul_word2(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rt] = mul32(R[inst.rs], inst.imm_val)
+
+    def _exec_and2(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rt] = R[inst.rs] & inst.imm_val
+
+    def _exec_set_on_less_than2(self, inst):
+        R = self.RF.R
+        self.PC += 4
+        R[inst.rt] = int(R[inst.rs] < inst.imm_val)
+
+    _execute_table = {
+        InstructionBreakpoint: _exec_break,
+        InstructionNoOperation: _exec_nop,
+        InstructionJump: _exec_jump,
+        InstructionJumpRegister: _exec_jump_register,
+        InstructionBranchOnEqual: _exec_branch_on_equal,
+        InstructionBranchOnGreaterThanZero: _exec_branch_on_greater_than_zero,
+        InstructionBranchOnLessThanZero: _exec_branch_on_less_than_zero,
+        InstructionStoreWord: _exec_store_word,
+        InstructionLoadWord: _exec_load_word,
+        InstructionShiftWordLeftLogical: _exec_shift_word_left_logical,
+        InstructionShiftWordRightLogical: _exec_shift_word_right_logical,
+        InstructionShiftWordRightArithmetic: _exec_shift_word_right_arithmetic,
+        InstructionAnd: _exec_and,
+        InstructionNotOr: _exec_not_or,
+        InstructionMulWord: _exec_mul_word,
+        InstructionSubtractWord: _exec_subtract_word,
+        InstructionAddWord: _exec_add_word,
+        InstructionSetOnLessThan: _exec_set_on_less_than,
+        InstructionAddWord2: _exec_add_word2,
+        InstructionSubWord2: _exec_sub_word2,
+        InstructionMulWord2: _exec_mul_word2,
+        InstructionAnd2: _exec_and2,
+        InstructionSetOnLessThan2: _exec_set_on_less_than2,
+    }
+
+
+class RunSummary:
+    """
+    Result of SimpleSim.run: number of executed instructions, stop reason and the final state.
+    """
+    BREAK = 'break'
+    MAX_INSTRUCTIONS = 'max_instructions'
+    UNTIL_PC = 'until_pc'
+
+    def __init__(self, instructions, stop_reason, pc, cycle, registers):
+        self.instructions = instructions
+        self.stop_reason = stop_reason
+        self.pc = pc
+        self.cycle = cycle
+        self.registers = registers
+
+    def __str__(self):
+        return 'instructions: {}, stop: {}, PC: {}, cycle: {}'.format(
+            self.instructions, self.stop_reason, self.pc, self.cycle)
+
+
+def _thread_instr(inst):
+    """
+    specialize the instruction into a closure for the threaded mode of SimpleSim. The register indices, the immediate
+    and the next PC are bound once, the closure executes the instruction on the register list and the data segment.
+    :param inst: decoded Instruction
+    :return: closure (regs, mem) -> next PC, or None for BREAK
+    """
+    cls = inst.__class__
+    next_pc = inst.pc_val + 4
+    rs, rt, rd, sa = inst.rs, inst.rt, inst.rd, inst.shamt
+
+    if cls is InstructionBreakpoint:
+        def run(R, DS):
+            return None
+    elif cls is InstructionNoOperation:
+        def run(R, DS):
+            return next_pc
+    # branch instructions
+    elif cls is InstructionJump:
+        target = inst.dest
+
+        def run(R, DS):
+            return target
+    elif cls is InstructionJumpRegister:
+        def run(R, DS):
+            return R[rs]
+    elif cls is InstructionBranchOnEqual:
+        target = next_pc + inst.dest
+
+        def run(R, DS):
+            return target if R[rs] == R[rt] else next_pc
+    elif cls is InstructionBranchOnGreaterThanZero:
+        target = next_pc + (sign_extend(inst.imm) << 2)
+
+        def run(R, DS):
+            return target if R[rs] > 0 else next_pc
+    elif cls is InstructionBranchOnLessThanZero:
+        target = next_pc + (sign_extend(inst.imm) << 2)
+
+        def run(R, DS):
+            return target if R[rs] < 0 else next_pc
+    # memory instructions
+    elif cls is InstructionStoreWord:
+        offset = inst.op1_val
+
+        def run(R, DS):
+            DS.mem_write(R[rs] + offset, R[rt])
+            return next_pc
+    elif cls is InstructionLoadWord:
+        offset = inst.op1_val
+
+        def run(R, DS):
+            R[rt] = DS.mem_read(offset + R[rs])
+            return next_pc
+    # category 1 ALU instructions, rd <- rs op rt
+    elif cls is InstructionShiftWordLeftLogical:
+        def run(R, DS):
+            R[rd] = sll(R[rt], sa)
+            return next_pc
+    elif cls is InstructionShiftWordRightLogical:
+        def run(R, DS):
+            R[rd] = srl(R[rt], sa)
+            return next_pc
+    elif cls is InstructionShiftWordRightArithmetic:
+        def run(R, DS):
+            R[rd] = sra(R[rt], sa)
+            return next_pc
+    elif cls is InstructionAnd:
+        def run(R, DS):
+            R[rd] = R[rs] & R[rt]
+            return next_pc
+    elif cls is InstructionNotOr:
+        def run(R, DS):
+            R[rd] = ~(R[rs] | R[rt])
+            return next_pc
+    elif cls is InstructionMulWord:
+        def run(R, DS):
+            R[rd] = mul32(R[rs], R[rt])
+            return next_pc
+    elif cls is InstructionSubtractWord:
+        def run(R, DS):
+            R[rd] = R[rs] - R[rt]
+            return next_pc
+    elif cls is InstructionAddWord:
+        def run(R, DS):
+            R[rd] = R[rs] + R[rt]
+            return next_pc
+    elif cls is InstructionSetOnLessThan:
+        def run(R, DS):
+            R[rd] = int(R[rs] < R[rt])
+            return next_pc
+    # category 2 ALU instructions, rt <- rs op immediate
+    elif cls in (InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2,
+                 InstructionSetOnLessThan2):
+        imm = inst.imm_val
+        if cls is InstructionAddWord2:
+            def run(R, DS):
+                R[rt] = R[rs] + imm
+                return next_pc
+        elif cls is InstructionSubWord2:
+            def run(R, DS):
+                R[rt] = R[rs] - imm
+                return next_pc
+        elif cls is InstructionMulWord2:
+            def run(R, DS):
+                R[rt] = mul32(R[rs], imm)
+                return next_pc
+        elif cls is InstructionAnd2:
+            def run(R, DS):
+                R[rt] = R[rs] & imm
+                return next_pc
+        else:
+            def run(R, DS):
+                R[rt] = int(R[rs] < imm)
+                return next_pc
+    else:
+        raise RuntimeError('no threaded code for ' + cls.__name__)
+    return run
 
 
 # m16 = lamda x : x 0xFFFF
@@ -121,31 +501,4 @@ class RegisterFile:
             raise Exception('Register address out of range!')
 
 
-class DataSegment:
-    """
-    Data Segment of the memory. Starts from 64 of the program and until the end of the file.
-    """
-
-    def __init__(self, data_mem):
-        self._table = data_mem
-        self.print_width = 8
-
-    def __str__(self):
-        desc_str = 'Data'
-        cnt = 0
-        for key, value in self._table.items():
-            if cnt % self.print_width == 0:
-                desc_str += '\n{}:'.format(key)
-            desc_str += '\t{}'.format(value.int_val)
-            cnt += 1
-
-        return desc_str + '\n'
-
-    def mem_write(self, mem_addr: int, value: int):
-        self._table[mem_addr].int_val = value
-
-    def mem_read(self, mem_addr: int) -> int:
-        return self._table[mem_addr].int_val
-
-
 ## todo rename to 16bit_str --> 32bit__str
\ No newline at end of file
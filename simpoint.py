@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import argparse as ap
+from utils import extract_image
+from simplesim import SimpleSim
+from sampling import measure_window
+
+parser = ap.ArgumentParser(description='SimPoint style phase selection for the MIPS 32 Simulator')
+subparsers = parser.add_subparsers(dest='command', required=True)
+parser_profile = subparsers.add_parser('profile', help="collect the basic block vectors of a program with SimpleSim")
+parser_profile.add_argument('--input', type=str, default='testsample.txt',
+                            help="path of input file")
+parser_profile.add_argument('--interval', type=int, default=10000,
+                            help="number of instructions of an interval")
+parser_profile.add_argument('--output', type=str, default='program.bbv',
+                            help="path of output file for the basic block vectors")
+parser_cluster = subparsers.add_parser('cluster', help="cluster the vectors and select the simulation points")
+parser_cluster.add_argument('--bbv', type=str, default='program.bbv',
+                            help="path of the basic block vectors file")
+parser_cluster.add_argument('--k', type=int, default=5,
+                            help="number of clusters")
+parser_cluster.add_argument('--seed', type=int, default=0,
+                            help="seed of the k-means initialization")
+parser_cluster.add_argument('--output', type=str, default='program.simpoints',
+                            help="path of output file for the simulation points")
+parser_estimate = subparsers.add_parser('estimate', help="estimate the cycles from pipeline runs on the simulation points")
+parser_estimate.add_argument('--input', type=str, default='testsample.txt',
+                             help="path of input file")
+parser_estimate.add_argument('--simpoints', type=str, default='program.simpoints',
+                             help="path of the simulation points file")
+parser_estimate.add_argument('--warmup', type=int, default=200,
+                             help="number of instructions simulated in detail before the measure of each point")
+parser_estimate.add_argument('--window', type=int, default=1000,
+                             help="number of measured instructions of each point")
+
+
+def write_bbv(path, starts, vectors):
+    """
+    one line per interval: the instruction count at its start, then entry PC:instructions of each block
+    """
+    with open(path, 'wt') as file_out:
+        for start, vector in zip(starts, vectors):
+            file_out.write('{}\t{}\n'.format(start, ' '.join(
+                '{}:{}'.format(pc, cnt) for pc, cnt in sorted(vector.items()))))
+
+
+def read_bbv(path):
+    """
+    :return: list of the interval starts, list of the vectors as dicts, see write_bbv
+    """
+    starts, vectors = [], []
+    with open(path, 'r') as file_in:
+        for read_buf in file_in:
+            start, _, items = read_buf.strip().partition('\t')
+            starts.append(int(start))
+            vectors.append({int(pc): int(cnt) for pc, cnt in (item.split(':') for item in items.split())})
+    return starts, vectors
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('the clustering of the basic block vectors requires numpy')
+    return numpy
+
+
+def kmeans(np, data, k, seed=0, iterations=100):
+    """
+    k-means with the k-means++ initialization
+    :param np: numpy module
+    :param data: array (n, d) of the points
+    :param k: number of clusters, at most n
+    :param seed: seed of the initialization
+    :param iterations: maximum number of iterations
+    :return: array (n, ) of the cluster of each point, array (k, d) of the centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = [data[rng.integers(len(data))]]
+    for _ in range(1, k):
+        dist = ((data[:, None, :] - np.array(centroids)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        if dist.sum() == 0:
+            break
+        centroids.append(data[rng.choice(len(data), p=dist / dist.sum())])
+    centroids = np.array(centroids)
+    labels = None
+    for _ in range(iterations):
+        dist = ((data[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = dist.argmin(axis=1)
+        if labels is not None and (new_labels == labels).all():
+            break
+        labels = new_labels
+        for idx in range(len(centroids)):
+            members = data[labels == idx]
+            if len(members):
+                centroids[idx] = members.mean(axis=0)
+    return labels, centroids
+
+
+def select_simpoints(starts, vectors, k, seed=0):
+    """
+    cluster the basic block vectors, normalized to the frequency of each block, and take in each cluster the
+    interval closest to the centroid as its simulation point
+    :param starts: list of the interval starts
+    :param vectors: list of the basic block vectors as dicts
+    :param k: number of clusters
+    :param seed: seed of the k-means initialization
+    :return: list of (interval start, weight), the weight is the fraction of the intervals in the cluster
+    """
+    np = _import_numpy()
+    pcs = sorted(set(pc for vector in vectors for pc in vector))
+    columns = {pc: idx for idx, pc in enumerate(pcs)}
+    data = np.zeros((len(vectors), len(pcs)))
+    for row, vector in enumerate(vectors):
+        for pc, cnt in vector.items():
+            data[row, columns[pc]] = cnt
+    data /= data.sum(axis=1, keepdims=True)
+    labels, centroids = kmeans(np, data, min(k, len(vectors)), seed)
+    simpoints = []
+    for idx, centroid in enumerate(centroids):
+        members = np.flatnonzero(labels == idx)
+        if len(members) == 0:
+            continue
+        closest = members[((data[members] - centroid) ** 2).sum(axis=1).argmin()]
+        simpoints.append((starts[closest], len(members) / len(vectors)))
+    return sorted(simpoints)
+
+
+def write_simpoints(path, simpoints):
+    with open(path, 'wt') as file_out:
+        for start, weight in simpoints:
+            file_out.write('{}\t{:.6f}\n'.format(start, weight))
+
+
+def read_simpoints(path):
+    with open(path, 'r') as file_in:
+        return [(int(start), float(weight)) for start, weight in (line.split() for line in file_in if line.strip())]
+
+
+def estimate_cycles(instr_mem, data_mem, simpoints, warmup=200, window=1000):
+    """
+    run the program functionally and measure the CPI with the pipeline at each simulation point, the cycles of
+    the program are estimated with the weighted CPI
+    :param instr_mem: instruction memory
+    :param data_mem: data memory
+    :param simpoints: list of (interval start, weight)
+    :param warmup: number of instructions of a window before the measure
+    :param window: number of measured instructions of a window
+    :return: number of instructions of the program, estimated CPI
+    """
+    sim = SimpleSim(instr_mem, data_mem, mode='block')
+    cpi = 0.0
+    weights = 0.0
+    for start, weight in sorted(simpoints):
+        sim.run(max_instructions=start - sim.cycle)
+        if sim.is_over:
+            break
+        measured, _, _ = measure_window(instr_mem, sim, warmup, window)
+        if measured is not None:
+            cpi += weight * measured[1] / measured[0]
+            weights += weight
+    sim.run()
+    if weights == 0:
+        raise RuntimeError('no simulation point measured any instruction')
+    return sim.cycle, cpi / weights
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    if args.command == 'profile':
+        sim = SimpleSim(*extract_image(args.input), mode='block')
+        write_bbv(args.output, *sim.collect_bbv(args.interval))
+    elif args.command == 'cluster':
+        write_simpoints(args.output, select_simpoints(*read_bbv(args.bbv), args.k, args.seed))
+    else:
+        instructions, cpi = estimate_cycles(*extract_image(args.input), read_simpoints(args.simpoints),
+                                            args.warmup, args.window)
+        print('Instructions:\t{}\nCPI:\t{:.4f}\nCycles:\t{:.0f}'.format(instructions, cpi, instructions * cpi))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import sys
+import unittest
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TEST_DIR))
+
+from utils import extract_image
+from pipeline import Pipeline
+from MIPSsim import write_pipeline_trace
+
+
+class _UnskippedPipeline(Pipeline):
+    """
+    pipeline simulating every cycle
+    """
+
+    def fast_forward(self, max_cycles=None):
+        return 0
+
+
+def pipeline_trace(pipeline_class, latency, input_path, max_cycles=10000):
+    """
+    :return: (True if the program ended, cycles, output of write_pipeline_trace)
+    """
+    sim_class = type(pipeline_class.__name__, (pipeline_class, ), {'alub_latency': latency})
+    sim = sim_class(*extract_image(input_path))
+    buf = io.StringIO()
+    done = write_pipeline_trace(sim, buf, max_cycles)
+    return done, sim.cycle, buf.getvalue()
+
+
+class FastForwardTest(unittest.TestCase):
+
+    def test_latency_2_matches_reference(self):
+        done, _, trace = pipeline_trace(Pipeline, 2, os.path.join(TEST_DIR, 'sample.txt'))
+        self.assertTrue(done)
+        with open(os.path.join(TEST_DIR, 'ref_simulation.txt')) as ref_file:
+            self.assertEqual(trace.split(), ref_file.read().split())
+
+    def test_skipped_trace_matches_unskipped(self):
+        input_path = os.path.join(TEST_DIR, 'sample.txt')
+        _, _, ref_trace = pipeline_trace(Pipeline, 2, input_path)
+        final_state = ref_trace[ref_trace.rindex('Registers'):]
+        prev_cycles = 0
+        for latency in range(3, 11):
+            with self.subTest(latency=latency):
+                done, cycles, trace = pipeline_trace(Pipeline, latency, input_path)
+                self.assertTrue(done)
+                self.assertEqual(pipeline_trace(_UnskippedPipeline, latency, input_path), (done, cycles, trace))
+                # the latency changes the timing, not the result of the program
+                self.assertEqual(trace[trace.rindex('Registers'):], final_state)
+                self.assertGreater(cycles, prev_cycles)
+                prev_cycles = cycles
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+from mips32 import InstructionJump, InstructionJumpRegister, InstructionBranchOnEqual, InstructionBranchOnGreaterThanZero, InstructionBranchOnLessThanZero, InstructionStoreWord, InstructionLoadWord, InstructionShiftWordLeftLogical, InstructionShiftWordRightLogical, InstructionShiftWordRightArithmetic, InstructionAnd, InstructionNotOr, InstructionMulWord, InstructionSubtractWord, InstructionAddWord, InstructionSetOnLessThan, InstructionAddWord2, InstructionSubWord2, InstructionMulWord2, InstructionAnd2, InstructionSetOnLessThan2, InstructionNoOperation, InstructionBreakpoint, sign_extend
+from bitops import sll, srl, sra, mul32
+
+# rd <- rs op rt, rd <- op(rt, sa) and rt <- rs op immediate, as python expressions on the register locals
+_ALU_R_EXPRS = {
+    InstructionAnd: 'r{rs} & r{rt}',
+    InstructionNotOr: '~(r{rs} | r{rt})',
+    InstructionMulWord: 'mul32(r{rs}, r{rt})',
+    InstructionSubtractWord: 'r{rs} - r{rt}',
+    InstructionAddWord: 'r{rs} + r{rt}',
+    InstructionSetOnLessThan: 'int(r{rs} < r{rt})',
+}
+_SHIFT_EXPRS = {
+    InstructionShiftWordLeftLogical: 'sll(r{rt}, {sa})',
+    InstructionShiftWordRightLogical: 'srl(r{rt}, {sa})',
+    InstructionShiftWordRightArithmetic: 'sra(r{rt}, {sa})',
+}
+_ALU_2_EXPRS = {
+    InstructionAddWord2: 'r{rs} + {imm}',
+    InstructionSubWord2: 'r{rs} - {imm}',
+    InstructionMulWord2: 'mul32(r{rs}, {imm})',
+    InstructionAnd2: 'r{rs} & {imm}',
+    InstructionSetOnLessThan2: 'int(r{rs} < {imm})',
+}
+
+
+class BlockTranslator:
+    """
+    Dynamic translation of the program into python functions, one per basic block. A basic block starts at the
+    entry PC and ends at J, JR, BEQ, BGTZ, BLTZ or BREAK. The python source of the block keeps the registers in
+    locals, it is compiled once and cached by the entry PC. The blocks covering an address are invalidated when
+    a store hits the code region.
+    The block functions take (R, DS) and return (next PC, number of executed instructions), next PC is None after
+    BREAK.
+    """
+
+    def __init__(self, instr_mem, max_block_size=256):
+        self.instr_mem = instr_mem
+        self.max_block_size = max_block_size
+        pcs = list(instr_mem.keys())
+        self.code_start = min(pcs) if pcs else 0
+        self.code_end = max(pcs) + 4 if pcs else 0
+        self.translations = 0
+        self.hits = 0
+        self.block_execs = 0
+        self.invalidations = 0
+        self._blocks = {}
+        self._block_ends = {}
+        self._globals = {'sll': sll, 'srl': srl, 'sra': sra, 'mul32': mul32, 'invalidate': self.invalidate}
+
+    def __str__(self):
+        return 'translations: {}, hits: {}, block executions: {}, invalidations: {}'.format(
+            self.translations, self.hits, self.block_execs, self.invalidations)
+
+    def lookup(self, pc):
+        """
+        get the compiled block starting at pc, the block is translated on the first lookup
+        :param pc: entry PC of the block
+        :return: block function
+        """
+        block = self._blocks.get(pc)
+        if block is None:
+            block = self._blocks[pc] = self._translate(pc)
+            self.translations += 1
+        else:
+            self.hits += 1
+        self.block_execs += 1
+        return block
+
+    def invalidate(self, mem_addr):
+        """
+        drop the compiled blocks which cover the address
+        :param mem_addr: address written by a store
+        """
+        for entry_pc, end_pc in list(self._block_ends.items()):
+            if entry_pc <= mem_addr < end_pc:
+                del self._blocks[entry_pc]
+                del self._block_ends[entry_pc]
+                self.invalidations += 1
+
+    def _translate(self, entry_pc):
+        body = []
+        regs_read = set()
+        regs_written = set()
+        pc = entry_pc
+        cnt = 0
+        exit_expr = None
+        while exit_expr is None:
+            inst = self.instr_mem[pc]
+            cnt += 1
+            body.append('    # {}\t{}'.format(pc, inst.desc_str))
+            exit_expr = self._translate_instr(inst, cnt, body, regs_read, regs_written)
+            pc += 4
+            if exit_expr is None and (cnt >= self.max_block_size or pc not in self.instr_mem):
+                exit_expr = str(pc)
+
+        writeback = ['    R[{0}] = r{0}'.format(reg) for reg in sorted(regs_written)]
+        src = ['def block(R, DS):']
+        src += ['    r{0} = R[{0}]'.format(reg) for reg in sorted(regs_read | regs_written)]
+        src += ['    mem_read = DS.mem_read', '    mem_write = DS.mem_write']
+        # the early exits of the stores into the code region need the final write back as well
+        src += [line.replace('<writeback>', '\n'.join(['    ' + wb for wb in writeback]) or '        pass')
+                for line in body]
+        src += writeback
+        src += ['    return {}, {}'.format(exit_expr, cnt)]
+
+        namespace = dict(self._globals)
+        exec(compile('\n'.join(src), '<block {}>'.format(entry_pc), 'exec'), namespace)
+        self._block_ends[entry_pc] = pc
+        return namespace['block']
+
+    def _translate_instr(self, inst, cnt, body, regs_read, regs_written):
+        # append the source of a non terminating instruction to body, or return the next PC expression of the block
+        cls = inst.__class__
+        next_pc = inst.pc_val + 4
+        rs, rt, rd = inst.rs, inst.rt, inst.rd
+        if cls is InstructionBreakpoint:
+            return 'None'
+        elif cls is InstructionJump:
+            return str(inst.dest)
+        elif cls is InstructionJumpRegister:
+            regs_read.add(rs)
+            return 'r{}'.format(rs)
+        elif cls is InstructionBranchOnEqual:
+            regs_read.update((rs, rt))
+            return '{} if r{} == r{} else {}'.format(next_pc + inst.dest, rs, rt, next_pc)
+        elif cls is InstructionBranchOnGreaterThanZero:
+            regs_read.add(rs)
+            return '{} if r{} > 0 else {}'.format(next_pc + (sign_extend(inst.imm) << 2), rs, next_pc)
+        elif cls is InstructionBranchOnLessThanZero:
+            regs_read.add(rs)
+            return '{} if r{} < 0 else {}'.format(next_pc + (sign_extend(inst.imm) << 2), rs, next_pc)
+        elif cls is InstructionNoOperation:
+            return None
+        elif cls is InstructionLoadWord:
+            regs_read.add(rs)
+            regs_written.add(rt)
+            body.append('    r{} = mem_read({} + r{})'.format(rt, inst.op1_val, rs))
+        elif cls is InstructionStoreWord:
+            regs_read.update((rs, rt))
+            body.append('    addr = r{} + {}'.format(rs, inst.op1_val))
+            body.append('    mem_write(addr, r{})'.format(rt))
+            body.append('    if {} <= addr < {}:'.format(self.code_start, self.code_end))
+            body.append('<writeback>')
+            body.append('        invalidate(addr)')
+            body.append('        return {}, {}'.format(next_pc, cnt))
+        elif cls in _ALU_R_EXPRS:
+            regs_read.update((rs, rt))
+            regs_written.add(rd)
+            body.append('    r{} = {}'.format(rd, _ALU_R_EXPRS[cls].format(rs=rs, rt=rt)))
+        elif cls in _SHIFT_EXPRS:
+            regs_read.add(rt)
+            regs_written.add(rd)
+            body.append('    r{} = {}'.format(rd, _SHIFT_EXPRS[cls].format(rt=rt, sa=inst.shamt)))
+        elif cls in _ALU_2_EXPRS:
+            regs_read.add(rs)
+            regs_written.add(rt)
+            body.append('    r{} = {}'.format(rt, _ALU_2_EXPRS[cls].format(rs=rs, imm=inst.imm_val)))
+        else:
+            raise RuntimeError('no translation for ' + cls.__name__)
+        return None
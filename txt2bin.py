@@ -0,0 +1,12 @@
+import argparse as ap
+from utils import convert_text_to_bin
+
+parser = ap.ArgumentParser(description='Convert the text input of the MIPS 32 Simulator to the binary format')
+parser.add_argument('--input', type=str, default='testsample.txt',
+                    help="path of text input file, one '0'/'1' line per word")
+parser.add_argument('--output', type=str, default='testsample.bin',
+                    help="path of binary output file, raw big-endian words for MIPSsim.py --input-format bin")
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    print('{} words written to {}'.format(convert_text_to_bin(args.input, args.output), args.output))
@@ -1,28 +1,203 @@
 # -*- coding: utf-8 -*-
 
-from mips32 import Instruction, Data
+from mips32 import Instruction, Data, InstructionBreakpoint, lookup_instr
 from collections import OrderedDict
+from collections.abc import Mapping
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+import re
+import struct
+import sys
 
-def extract_data(in_file_path):
+def iter_words(in_file_path, input_format='text'):
+    """
+    read the 32-bit words of the input file one by one.
+    'text': one 32 characters '0'/'1' line per word
+    'bin': raw big-endian words, the file is memory mapped and decoded straight from the buffer
+    :param in_file_path: path of input file
+    :param input_format: 'text' or 'bin'
+    :return: generator of the words as unsigned integers
+    """
+    if input_format == 'bin':
+        with open(in_file_path, 'rb') as file_in:
+            if os.fstat(file_in.fileno()).st_size == 0:  # empty file can not be mapped
+                return
+            with mmap.mmap(file_in.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if len(buf) % 4:
+                    raise RuntimeError('binary input size is not a multiple of 4 bytes')
+                with memoryview(buf) as view:
+                    for (word, ) in struct.iter_unpack('>I', view):
+                        yield word
+    elif input_format == 'text':
+        with open(in_file_path, 'r') as file_in:
+            for read_buf in file_in:
+                yield int(read_buf.strip(), 2)
+    else:
+        raise RuntimeError('unknown input format ' + str(input_format))
+
+
+def load_word_array(in_file_path, input_format='text'):
+    """
+    read all the words of the input file into a numpy uint32 array, see iter_words for the formats.
+    The text format is parsed with array operations: the '0'/'1' characters are packed 8 bits at a time.
+    :param in_file_path: path of input file
+    :param input_format: 'text' or 'bin'
+    :return: numpy array of the words
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError('load_word_array requires numpy')
+    if input_format == 'bin':
+        return np.fromfile(in_file_path, dtype='>u4').astype(np.uint32)
+    elif input_format != 'text':
+        raise RuntimeError('unknown input format ' + str(input_format))
+    raw = np.fromfile(in_file_path, dtype=np.uint8)
+    is_bit = (raw == ord('0')) | (raw == ord('1'))
+    line_cnt = int((is_bit[1:] & ~is_bit[:-1]).sum() + is_bit[:1].sum())
+    if not np.isin(raw[~is_bit], np.frombuffer(b' \t\r\n', dtype=np.uint8)).all() or is_bit.sum() != 32 * line_cnt:
+        raise RuntimeError('wrong binary string format')
+    bits = (raw[is_bit] - ord('0')).reshape(-1, 32)
+    return np.packbits(bits, axis=1).view('>u4').reshape(-1).astype(np.uint32)
+
+
+def convert_text_to_bin(in_file_path, out_file_path):
+    """
+    convert the '0'/'1' text input to the raw big-endian word format read by iter_words(..., 'bin')
+    :param in_file_path: path of the text input file
+    :param out_file_path: path of the binary output file
+    :return: number of words written
+    """
+    words = array('I', iter_words(in_file_path, 'text'))
+    if sys.byteorder == 'little':
+        words.byteswap()
+    with open(out_file_path, 'wb') as file_out:
+        words.tofile(file_out)
+    return len(words)
+
+
+# BREAK is SPECIAL/SPECIAL2 with function code 001101, the 20 bits code field in between may hold anything
+_BREAK_LINE_PATTERN = re.compile(rb'^(?:000000|011100)[01]{20}001101\s*$', re.M)
+
+
+def _chunk_bounds(in_file_path, input_format, chunk_cnt):
+    """
+    split the input file into byte ranges which start at a word boundary
+    :return: list of (start, stop) byte offsets
+    """
+    file_size = os.path.getsize(in_file_path)
+    chunk_size = max(file_size // chunk_cnt, 1)
+    if input_format == 'bin':
+        chunk_size += -chunk_size % 4
+        return [(start, min(start + chunk_size, file_size)) for start in range(0, file_size, chunk_size)]
+    bounds = []
+    start = 0
+    with open(in_file_path, 'rb') as file_in:
+        while start < file_size:
+            file_in.seek(min(start + chunk_size, file_size) - 1)
+            file_in.readline()  # move to the end of the line
+            stop = file_in.tell()
+            bounds.append((start, stop))
+            start = stop
+    return bounds
+
+
+def _read_chunk(in_file_path, start, stop):
+    with open(in_file_path, 'rb') as file_in:
+        file_in.seek(start)
+        return file_in.read(stop - start)
+
+
+def _chunk_words(chunk, input_format):
+    if input_format == 'bin':
+        words = array('I', chunk)
+        if sys.byteorder == 'little':
+            words.byteswap()
+        return words
+    return [int(read_buf, 2) for read_buf in chunk.split()]
+
+
+def _scan_chunk(in_file_path, input_format, start, stop):
+    """
+    pre-scan of a chunk for dis_assembly_parallel
+    :return: number of words in the chunk and index of the first BREAK in the chunk, or -1
+    """
+    chunk = _read_chunk(in_file_path, start, stop)
+    if input_format == 'bin':
+        words = _chunk_words(chunk, input_format)
+        break_idx = next((idx for idx, word in enumerate(words)
+                          if word >> 26 in (0b000000, 0b011100) and word & 0x3F == 0b001101), -1)
+        return len(words), break_idx
+    word_cnt = chunk.count(b'\n') + (0 if chunk.endswith(b'\n') or not chunk else 1)
+    match = _BREAK_LINE_PATTERN.search(chunk)
+    return word_cnt, chunk.count(b'\n', 0, match.start()) if match else -1
+
+
+def _dis_assembly_chunk(in_file_path, input_format, start, stop, pc_val, break_pc):
+    """
+    disassemble a chunk for dis_assembly_parallel, the words after break_pc are formatted as Data
+    :return: disassembly text of the chunk
+    """
+    lines = []
+    for word in _chunk_words(_read_chunk(in_file_path, start, stop), input_format):
+        if break_pc is not None and pc_val > break_pc:
+            lines.append(str(Data.from_word(word, pc_val=pc_val)) + '\n')
+        else:
+            lines.append(str(Instruction.from_word(word, pc_val=pc_val)) + '\n')
+        pc_val += 4
+    return ''.join(lines)
+
+
+def dis_assembly_parallel(in_file_path, out_file_path, jobs, input_format='text', pc_val=64):
+    """
+    disassemble a large input file in a process pool. The file is split into byte ranges, a cheap pre-scan counts
+    the words of each range and finds the BREAK, then the ranges are decoded in parallel and written in order.
+    :param in_file_path: path of input file
+    :param out_file_path: path of the disassembly output file
+    :param jobs: number of worker processes
+    :param input_format: 'text' or 'bin', see iter_words
+    :param pc_val: address of the first word
+    :return: number of words disassembled
+    """
+    bounds = _chunk_bounds(in_file_path, input_format, jobs * 4)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        scans = [future.result() for future in
+                 [executor.submit(_scan_chunk, in_file_path, input_format, start, stop) for start, stop in bounds]]
+        chunk_pcs = []
+        break_pc = None
+        for word_cnt, break_idx in scans:
+            if break_pc is None and break_idx >= 0:
+                break_pc = pc_val + 4 * break_idx
+            chunk_pcs.append(pc_val)
+            pc_val += 4 * word_cnt
+
+        futures = [executor.submit(_dis_assembly_chunk, in_file_path, input_format, start, stop, chunk_pc, break_pc)
+                   for (start, stop), chunk_pc in zip(bounds, chunk_pcs)]
+        with open(out_file_path, 'wt') as file_out:
+            for future in futures:
+                file_out.write(future.result())
+    return sum(word_cnt for word_cnt, _ in scans)
+
+
+def extract_data(in_file_path, decode_cache=None, input_format='text'):
     inst_byte_size = 4
     PC = 64
-    read_buf = b''
     is_break = False
     inst_mem = OrderedDict()
     data_mem = OrderedDict()
 
-    with open(in_file_path, 'r') as file_in:
-        for read_buf in file_in.readlines():
-            read_buf = read_buf.strip()
-            if not is_break:
-                inst = Instruction(instr_str=read_buf, pc_val=PC)
-                inst_mem[PC] = inst
-                is_break = inst.is_break()
-            else:
-                data = Data(data_str=read_buf, pc_val=PC)
-                data_mem[PC] = data
+    for word in iter_words(in_file_path, input_format):
+        if not is_break:
+            inst = Instruction.from_word(word, PC, cache=decode_cache)
+            inst_mem[PC] = inst
+            is_break = inst.is_break()
+        else:
+            data = Data.from_word(word, pc_val=PC)
+            data_mem[PC] = data
 
-            PC += inst_byte_size
+        PC += inst_byte_size
 
     # print(inst_mem)
     # print(data_mem)
@@ -31,6 +206,136 @@ def extract_data(in_file_path):
     return inst_mem, data_mem
 
 
+class ProgramImage(Mapping):
+    """
+    Compact instruction memory. The decoded fields of each word are kept in parallel arrays indexed by
+    (pc - base) >> 2, and the Instruction objects are only built when an instruction is fetched. The handlers of
+    the simulators execute Instruction objects, thus the object of a fetched PC is kept in its slot and a loop
+    never decodes its instructions twice, whatever the size of the image. The code which is never fetched only
+    costs its array columns and an empty slot. With a decode_cache, the objects of the same word share their
+    decoded fields.
+    It can be used in place of the instruction dict returned by extract_data, e.g. instr_mem[pc] or
+    instr_mem.get(pc, None).
+    """
+
+    def __init__(self, base=64, decode_cache=None):
+        self.base = base
+        self.decode_cache = decode_cache
+        self.opcode = array('B')
+        self.rs = array('B')
+        self.rt = array('B')
+        self.imm = array('H')  # rd, shamt and funct of the R type words are in the low 16 bits as well
+        self.tag = array('B')  # index into self.entries
+        self.entries = []  # (class, instr_code) of each tag, see lookup_instr
+        self._entry_tag = {}
+        self._instrs = []  # Instruction of each fetched PC, None until it is fetched
+
+    def append(self, word):
+        """
+        decode one more instruction word at the end of the image.
+        :param word: instruction word as an unsigned 32-bit integer
+        :return: the concrete Instruction subclass of the word
+        """
+        entry = lookup_instr(word)
+        tag = self._entry_tag.get(entry)
+        if tag is None:
+            tag = self._entry_tag[entry] = len(self.entries)
+            self.entries.append(entry)
+        self.opcode.append(word >> 26)
+        self.rs.append((word >> 21) & 0x1F)
+        self.rt.append((word >> 16) & 0x1F)
+        self.imm.append(word & 0xFFFF)
+        self.tag.append(tag)
+        self._instrs.append(None)
+        return entry[0]
+
+    def _index(self, pc):
+        idx = (pc - self.base) >> 2
+        if pc & 3 or idx < 0 or idx >= len(self.tag):
+            raise KeyError(pc)
+        return idx
+
+    def _word(self, idx):
+        return (self.opcode[idx] << 26) | (self.rs[idx] << 21) | (self.rt[idx] << 16) | self.imm[idx]
+
+    def word(self, pc):
+        return self._word(self._index(pc))
+
+    def instr_class(self, pc):
+        return self.entries[self.tag[self._index(pc)]][0]
+
+    def __getitem__(self, pc):
+        idx = self._index(pc)
+        inst = self._instrs[idx]
+        if inst is None:
+            if self.decode_cache is not None:
+                inst = self.decode_cache.place(self._word(idx), pc)
+            else:
+                # the class of the word was looked up by append
+                inst = Instruction.from_entry(self._word(idx), pc, self.entries[self.tag[idx]])
+            self._instrs[idx] = inst
+        return inst
+
+    def __len__(self):
+        return len(self.tag)
+
+    def __iter__(self):
+        return iter(range(self.base, self.base + (len(self.tag) << 2), 4))
+
+
+def extract_image(in_file_path, decode_cache=None, input_format='text'):
+    """
+    same as extract_data, but the instructions are kept in a ProgramImage
+    :param in_file_path: path of input file
+    :param decode_cache: optional mips32.DecodeCache used when the instructions are fetched
+    :param input_format: 'text' or 'bin', see iter_words
+    :return: ProgramImage of the instructions and OrderedDict of the data
+    """
+    inst_byte_size = 4
+    PC = 64
+    is_break = False
+    inst_mem = ProgramImage(base=PC, decode_cache=decode_cache)
+    data_mem = OrderedDict()
+
+    for word in iter_words(in_file_path, input_format):
+        if not is_break:
+            is_break = inst_mem.append(word) is InstructionBreakpoint
+        else:
+            data_mem[PC] = Data.from_word(word, pc_val=PC)
+
+        PC += inst_byte_size
+
+    return inst_mem, data_mem
+
+
+def stream_program(in_file_path, inst_mem, data_mem, input_format='text'):
+    """
+    decode the input file in a single streaming pass. The words are yielded one by one, e.g. to the disassembly
+    writer, and the program for the simulation is built at the same time. The yielded instructions are put in the
+    instruction cache of inst_mem, the simulation does not decode them again.
+    inst_mem and data_mem are complete once the generator is exhausted.
+    :param in_file_path: path of input file
+    :param inst_mem: empty ProgramImage which receives the instructions, the first word is at its base address
+    :param data_mem: empty dict which receives the Data after BREAK keyed by address
+    :param input_format: 'text' or 'bin', see iter_words
+    :return: generator of the decoded Instruction and Data
+    """
+    inst_byte_size = 4
+    PC = inst_mem.base
+    is_break = False
+
+    for word in iter_words(in_file_path, input_format):
+        if not is_break:
+            is_break = inst_mem.append(word) is InstructionBreakpoint
+            # built from the entry looked up by append, and kept in the slot of PC
+            yield inst_mem[PC]
+        else:
+            data = data_mem[PC] = Data.from_word(word, pc_val=PC)
+            yield data
+
+        PC += inst_byte_size
+
+
 def int_to_16bitstr(val):
     """
     transfer the signed integer value to str. Currently only support 16 bits binary strings.